@@ -0,0 +1,201 @@
+# api/aggregates.py
+"""
+Estatísticas agregadas do catálogo, mantidas de forma incremental.
+Para o catálogo inteiro e para cada categoria guarda contagens, estoque e a
+contagem de cada valor de preço e de rating. Médias, mínimo/máximo e
+histogramas saem dessas contagens, então remover linhas (livro alterado pelo
+scraper) é exato: não há deriva de soma em ponto flutuante e min/max
+continuam válidos.
+O scraper aplica só o delta do merge (versões antigas saem, novas entram) e
+grava o resultado no snapshot; a API lê pronto na carga, e os endpoints de
+estatísticas servem respostas montadas uma vez por versão do dataset.
+"""
+
+import math
+from collections import Counter
+from typing import Optional
+import numpy as np
+import pandas as pd
+from api.compact import text_column
+
+AGGREGATES_FORMAT = 1
+PRICE_BIN_WIDTH = 10.0  # largura das faixas dos histogramas de preço (£)
+
+
+def _mean(values: Counter) -> Optional[float]:
+    n = sum(values.values())
+    return math.fsum(v * c for v, c in values.items()) / n if n else None
+
+
+def _add_counts(target: Counter, values: pd.Series, sign: int):
+    for value, n in values.value_counts().items():
+        target[float(value)] += sign * int(n)
+        if target[float(value)] == 0:
+            del target[float(value)]
+
+
+class _Group:
+    """Acumulador de um conjunto de livros (catálogo inteiro ou uma categoria)."""
+
+    def __init__(self):
+        self.count = 0
+        self.stock_total = 0
+        self.in_stock = 0
+        self.prices: Counter = Counter()  # preço -> livros
+        self.ratings: Counter = Counter()  # rating -> livros
+
+    def apply(self, frame: pd.DataFrame, sign: int):
+        self.count += sign * len(frame)
+        self.stock_total += sign * int(frame["stock"].sum())
+        self.in_stock += sign * int(frame["in_stock"].sum())
+        _add_counts(self.prices, frame["price"].dropna(), sign)
+        _add_counts(self.ratings, frame["rating"].dropna(), sign)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "average_price": _mean(self.prices),
+            "min_price": min(self.prices) if self.prices else None,
+            "max_price": max(self.prices) if self.prices else None,
+            "average_rating": _mean(self.ratings),
+            "stock_total": self.stock_total,
+            "in_stock": self.in_stock,
+        }
+
+    def price_histogram(self) -> list:
+        bins: Counter = Counter()
+        for value, n in self.prices.items():
+            bins[math.floor(value / PRICE_BIN_WIDTH)] += n
+        return [
+            {"min": b * PRICE_BIN_WIDTH, "max": (b + 1) * PRICE_BIN_WIDTH, "count": n}
+            for b, n in sorted(bins.items())
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "stock_total": self.stock_total,
+            "in_stock": self.in_stock,
+            "prices": [[v, n] for v, n in sorted(self.prices.items())],
+            "ratings": [[v, n] for v, n in sorted(self.ratings.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "_Group":
+        group = cls()
+        group.count, group.stock_total, group.in_stock = data["count"], data["stock_total"], data["in_stock"]
+        group.prices = Counter({float(v): n for v, n in data["prices"]})
+        group.ratings = Counter({float(v): n for v, n in data["ratings"]})
+        return group
+
+
+def _columns(rows: pd.DataFrame) -> pd.DataFrame:
+    """Colunas usadas nos agregados, a partir da tabela normalizada ou compacta."""
+    price = pd.to_numeric(rows["price_num"], errors="coerce").astype(np.float64)
+    return pd.DataFrame({
+        "category": rows["category"].astype(object),
+        "price": price.where(np.isfinite(price)),
+        "rating": pd.to_numeric(rows["rating"], errors="coerce").astype(np.float64),
+        "stock": pd.to_numeric(rows["stock"], errors="coerce").fillna(0),
+        "in_stock": text_column(rows, "availability").str.contains("In stock", case=False, na=False),
+    })
+
+
+class Aggregates:
+    def __init__(self):
+        self.total = _Group()
+        self.categories: dict[str, _Group] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Aggregates":
+        aggregates = cls()
+        aggregates.add(df)
+        return aggregates
+
+    def add(self, rows: pd.DataFrame, sign: int = 1):
+        """Soma (ou, com sign=-1, retira) as linhas de `rows`."""
+        if rows is None or rows.empty:
+            return
+        frame = _columns(rows)
+        self.total.apply(frame, sign)
+        # groupby descarta categoria nula: esses livros só contam no total
+        for category, part in frame.groupby("category", sort=False):
+            group = self.categories.setdefault(category, _Group())
+            group.apply(part, sign)
+            if group.count <= 0:
+                del self.categories[category]
+
+    def remove(self, rows: pd.DataFrame):
+        self.add(rows, sign=-1)
+
+    # --- respostas (montadas uma vez por versão do dataset) ---
+    def overview(self) -> dict:
+        summary = self.total.summary()
+        return {
+            "total_books": self.total.count,
+            "average_price": summary["average_price"],
+            "min_price": summary["min_price"],
+            "max_price": summary["max_price"],
+            "categories_count": len(self.categories),
+            "average_rating": summary["average_rating"],
+        }
+
+    def category_breakdown(self) -> dict:
+        categories = []
+        for name in sorted(self.categories):
+            group = self.categories[name]
+            categories.append({"category": name, **group.summary(), "price_histogram": group.price_histogram()})
+        return {"price_bin_width": PRICE_BIN_WIDTH, "categories": categories}
+
+    def rating_distribution(self) -> dict:
+        rated = sum(self.total.ratings.values())
+        return {
+            "ratings": {f"{v:g}": n for v, n in sorted(self.total.ratings.items())},
+            "unrated": self.total.count - rated,
+            "average_rating": _mean(self.total.ratings),
+        }
+
+    def stock(self) -> dict:
+        return {
+            "stock_total": self.total.stock_total,
+            "in_stock": self.total.in_stock,
+            "out_of_stock": self.total.count - self.total.in_stock,
+            "by_category": {
+                name: {"stock_total": group.stock_total, "in_stock": group.in_stock}
+                for name, group in sorted(self.categories.items())
+            },
+        }
+
+    def price_means(self) -> tuple[list, list, Optional[float]]:
+        """
+        (categorias, média de preço de cada uma, média geral), com livros sem
+        preço contando pela média geral, como no ajuste de CategoryPriceModel.
+        """
+        overall = _mean(self.total.prices)
+        if overall is None:
+            return [], [], None
+        names = sorted(self.categories)
+        means = []
+        for name in names:
+            group = self.categories[name]
+            missing = group.count - sum(group.prices.values())
+            total = math.fsum(v * n for v, n in group.prices.items()) + missing * overall
+            means.append(total / group.count)
+        return names, means, overall
+
+    # --- persistência (aggregates.json no snapshot) ---
+    def to_dict(self) -> dict:
+        return {
+            "format": AGGREGATES_FORMAT,
+            "total": self.total.to_dict(),
+            "categories": {name: group.to_dict() for name, group in sorted(self.categories.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["Aggregates"]:
+        if data.get("format") != AGGREGATES_FORMAT:
+            return None
+        aggregates = cls()
+        aggregates.total = _Group.from_dict(data["total"])
+        aggregates.categories = {name: _Group.from_dict(g) for name, g in data["categories"].items()}
+        return aggregates
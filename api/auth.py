@@ -3,8 +3,15 @@
 Módulo de autenticação JWT.
 Fornece endpoints: /auth/login e /auth/refresh
 E dependência para proteger rotas (get_current_user).
+Tokens já validados ficam num cache LRU (chave = hash do token) até o `exp`,
+evitando refazer o jwt.decode/HMAC a cada requisição protegida.
 """
 
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends, status, Body, Security
@@ -44,7 +51,8 @@ def create_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     now = datetime.utcnow()
     expire = now + (expires_delta or timedelta(minutes=ACCESS_EXPIRE_MIN))
-    to_encode.update({"exp": expire, "iat": now})
+    # jti: tokens emitidos no mesmo segundo continuam distintos (revogação por token)
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
 
 
@@ -96,17 +104,117 @@ def refresh_token(req: RefreshRequest):
     }
 
 
-# --- Dependência de autenticação protegida ---
-def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)):
+# --- Cache de tokens validados ---
+def token_key(token: str) -> str:
+    # o token em si nunca fica guardado em memória
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
     """
-    Valida o token JWT no cabeçalho Authorization: Bearer <token>.
+    LRU limitado de tokens já validados, cada entrada vale até o `exp` do token.
+    A lista de revogação (logout) é consultada inclusive nos acertos do cache.
+    Cache e revogação são por processo.
     """
-    token = credentials.credentials
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._revoked: dict[str, float] = {}  # hash -> exp (removido depois de expirar)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, user: dict, exp: float):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def revoke(self, key: str, exp: float):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked[key] = exp
+            # tokens revogados que já expiraram seriam recusados de qualquer forma
+            for k in [k for k, e in self._revoked.items() if e <= now]:
+                del self._revoked[k]
+
+    def is_revoked(self, key: str) -> bool:
+        return key in self._revoked
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revoked": len(self._revoked),
+        }
+
+
+token_cache = TokenCache(settings.AUTH_CACHE_SIZE)
+
+
+def _invalid_token():
+    return HTTPException(status_code=401, detail="Token inválido ou expirado")
+
+
+def _validate(token: str) -> tuple[str, dict]:
+    """Valida o token (cache ou jwt.decode) e devolve (chave, usuário)."""
+    key = token_key(token)
+    if token_cache.is_revoked(key):
+        raise _invalid_token()
+    user = token_cache.get(key)
+    if user is not None:
+        return key, user
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Token inválido ou expirado")
-        return {"username": username}
     except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
\ No newline at end of file
+        raise _invalid_token()
+    username = payload.get("sub")
+    if not username:
+        raise _invalid_token()
+    user = {"username": username}
+    # sem exp o token não expira; fica no cache até sair pelo LRU
+    token_cache.put(key, user, float(payload.get("exp", float("inf"))))
+    return key, user
+
+
+# --- Dependência de autenticação protegida ---
+def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """
+    Valida o token JWT no cabeçalho Authorization: Bearer <token>.
+    """
+    return _validate(credentials.credentials)[1]
+
+
+# --- Endpoint de logout (revoga o access token atual) ---
+@router.post("/logout")
+def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
+    key, _ = _validate(credentials.credentials)
+    # exp só para saber quando a revogação pode ser descartada
+    claims = jwt.get_unverified_claims(credentials.credentials)
+    token_cache.revoke(key, float(claims.get("exp", float("inf"))))
+    return {"status": "ok", "detail": "Token revogado"}
\ No newline at end of file
@@ -0,0 +1,124 @@
+# api/cache.py
+"""
+Cache de respostas pré-serializadas para endpoints estáticos do catálogo.
+Cada entrada guarda os bytes JSON já codificados (e variantes gzip/brotli)
+e é associada a uma versão do dataset: quando a versão muda a entrada é
+reconstruída. Suporta ETag / If-None-Match (304).
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from api.metrics import metrics, span
+
+try:  # brotli é opcional
+    import brotli
+except ImportError:
+    brotli = None
+
+# abaixo disso a compressão não compensa
+MIN_COMPRESS_SIZE = 1024
+
+
+def encode_json(content: Any) -> bytes:
+    """Codifica exatamente como o JSONResponse padrão do FastAPI."""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    header = request.headers.get("accept-encoding", "")
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # comparação fraca: ignora o prefixo W/
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    gzip_body: Optional[bytes] = None
+    br_body: Optional[bytes] = None
+    media_type: str = "application/json"
+
+    @classmethod
+    def build(cls, content: Any) -> "CachedResponse":
+        body = encode_json(content)
+        etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        gzip_body = br_body = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                br_body = brotli.compress(body)
+        return cls(body=body, etag=etag, gzip_body=gzip_body, br_body=br_body)
+
+    def to_response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if _etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        if self.br_body is not None and _accepts(request, "br"):
+            headers["Content-Encoding"] = "br"
+            return Response(self.br_body, media_type=self.media_type, headers=headers)
+        if self.gzip_body is not None and _accepts(request, "gzip"):
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+def _count_lookup(key: str, result: str):
+    metrics.inc("books_api_response_cache_total", help="Consultas ao cache de respostas", key=key, result=result)
+
+
+class ResponseCache:
+    """Cache chave -> (versão do dataset, resposta). Thread-safe."""
+
+    def __init__(self):
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: Hashable, build: Callable[[], Any]) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            _count_lookup(key, "hit")
+            return entry[1]
+        with self._lock:
+            # outra thread pode ter reconstruído enquanto esperávamos
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            _count_lookup(key, "miss")
+            with span(f"cache_build:{key}"):
+                cached = CachedResponse.build(build())
+            self._entries[key] = (version, cached)
+            return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# instância compartilhada pelos routers
+response_cache = ResponseCache()
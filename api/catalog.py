@@ -0,0 +1,172 @@
+# api/catalog.py
+"""
+Índices de acesso direto ao catálogo, calculados uma vez por carga do dataset:
+- id -> posição da linha (lookup O(1) em /books/{id}, vetorizado em /books/bulk)
+- permutações das linhas por preço, rating e título, em ordem crescente e
+  decrescente (top-rated e listagens ordenadas em O(limit))
+- as colunas do schema Book como arrays NumPy (BookTable): serializar k
+  linhas é indexar por posição, sem operações do pandas por requisição
+Também serializa as linhas pedidas no schema Book, remontando os textos da
+forma compacta (api.compact), e direto para JSON no caminho rápido opcional
+das listagens (FAST_JSON), sem passar pela validação do response_model.
+"""
+
+import json
+import sys
+from typing import Optional
+import numpy as np
+import pandas as pd
+from api.compact import ENCODED, is_encoded, owned_bytes, rebuild, template_column
+from api.schemas import Book
+
+try:  # orjson é opcional; sem ele o caminho rápido usa o json da stdlib
+    import orjson
+except ImportError:
+    orjson = None
+
+# campos do schema Book e o tipo de cada um (int ou str), na ordem da resposta
+BOOK_FIELDS = {
+    name: int if field.annotation in (int, Optional[int]) else str
+    for name, field in Book.model_fields.items()
+}
+
+_INT64_MIN, _INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+
+class CatalogIndex:
+    def __init__(self, df: pd.DataFrame):
+        # mantém a primeira ocorrência de cada id, como o filtro anterior (iloc[0])
+        ids = df["id"]
+        first = ~ids.duplicated().to_numpy()
+        self._ids = pd.Index(ids.to_numpy()[first])
+        self._id_positions = np.flatnonzero(first)
+        self._id_to_pos = dict(zip(self._ids.tolist(), self._id_positions.tolist()))
+
+        # chave numérica de cada ordenação (título vira o código na ordem alfabética)
+        titles = df["title"].astype("string").str.lower()
+        codes, _ = pd.factorize(titles, sort=True)
+        self._sort_keys = {
+            "price": pd.to_numeric(df["price_num"], errors="coerce").to_numpy(dtype=np.float64),
+            "rating": pd.to_numeric(df["rating"], errors="coerce").to_numpy(dtype=np.float64),
+            "title": np.where(codes < 0, np.nan, codes).astype(np.float64),
+        }
+        # "campo" = crescente, "-campo" = decrescente; nulos sempre no fim e empates na ordem original
+        self.orders = {}
+        for name, key in self._sort_keys.items():
+            self.orders[name] = np.argsort(key, kind="stable").astype(np.int32)
+            self.orders["-" + name] = np.argsort(-key, kind="stable").astype(np.int32)
+        self.rating_order = self.orders["-rating"]
+        self.table = BookTable(df)
+
+    def memory_bytes(self) -> int:
+        """Memória própria: id -> posição, ordenações e as colunas da BookTable que não são views."""
+        # dict id -> posição: estimativa com um objeto int (28 bytes) por chave e por valor
+        id_map = sys.getsizeof(self._id_to_pos) + len(self._id_to_pos) * 2 * sys.getsizeof(2**30)
+        arrays = [self._ids.to_numpy(), self._id_positions, *self._sort_keys.values(), *self.orders.values()]
+        return id_map + sum(owned_bytes(a) for a in arrays) + self.table.memory_bytes()
+
+    def position(self, book_id: int) -> Optional[int]:
+        return self._id_to_pos.get(book_id)
+
+    def positions(self, book_ids) -> np.ndarray:
+        """Posições de vários ids de uma vez, na ordem pedida (-1 = id inexistente)."""
+        # busca em int64, não no dtype (compacto) dos ids: valores fora da faixa só não são
+        # achados; ids além do próprio int64 (o JSON aceita qualquer inteiro) nem entram na busca
+        book_ids = list(book_ids)
+        valid = np.fromiter((_INT64_MIN <= i <= _INT64_MAX for i in book_ids), dtype=bool, count=len(book_ids))
+        lookup = np.array([i for i, ok in zip(book_ids, valid) if ok], dtype=np.int64)
+        found = np.full(len(book_ids), -1, dtype=np.intp)
+        found[valid] = self._ids.get_indexer(pd.Index(lookup))
+        result = np.full(len(found), -1, dtype=np.int64)
+        hit = found >= 0
+        result[hit] = self._id_positions[found[hit]]
+        return result
+
+    def sort(self, positions: np.ndarray, sort_by: str) -> np.ndarray:
+        """Reordena um subconjunto de linhas (ex.: resultado de uma busca) por `sort_by`."""
+        key = self._sort_keys[sort_by.removeprefix("-")][positions]
+        if sort_by.startswith("-"):
+            key = -key
+        return positions[np.argsort(key, kind="stable")]
+
+
+def _lookup(col: pd.Series, kind=None) -> tuple[np.ndarray, np.ndarray]:
+    """Categórica -> (códigos, valor de cada código); o código -1 (nulo) cai no None do fim."""
+    categories = col.cat.categories.tolist()
+    values = np.empty(len(categories) + 1, dtype=object)
+    values[:-1] = [kind(v) for v in categories] if kind else categories
+    values[-1] = None
+    return col.cat.codes.to_numpy(), values
+
+
+class BookTable:
+    """
+    Colunas do schema Book prontas para serializar, montadas uma vez por carga.
+    Numéricas e textos ficam como arrays NumPy (sem cópia), categóricas como
+    códigos + valores, campos codificados como códigos do molde + valor.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = {}
+        for name, kind in BOOK_FIELDS.items():
+            if is_encoded(df, name):
+                value_name, fmt = ENCODED[name]
+                codes, templates = _lookup(df[template_column(name)])
+                self.columns[name] = ("encoded", codes, templates, df[value_name].to_numpy(), fmt)
+            elif isinstance(df[name].dtype, pd.CategoricalDtype):
+                self.columns[name] = ("category", *_lookup(df[name], kind))
+            else:
+                nulls = df[name].isna().to_numpy()
+                plain = kind is int and pd.api.types.is_integer_dtype(df[name].dtype)
+                self.columns[name] = ("values", df[name].to_numpy(), nulls if nulls.any() else None,
+                                      None if plain else kind)
+
+    def memory_bytes(self) -> int:
+        # os str das categorias/moldes são os mesmos objetos da tabela; só os arrays próprios contam
+        return sum(
+            owned_bytes(part)
+            for _, *parts in self.columns.values() for part in parts if isinstance(part, np.ndarray)
+        )
+
+    def take(self, positions) -> dict:
+        """Colunas para as linhas pedidas, já como tipos Python (nulos -> None)."""
+        if not isinstance(positions, slice):
+            positions = np.asarray(positions, dtype=np.intp)
+        columns = {}
+        for name, (layout, *parts) in self.columns.items():
+            if layout == "encoded":
+                codes, templates, values, fmt = parts
+                # texto remontado a partir do molde + valor (só destas linhas)
+                columns[name] = rebuild(templates[codes[positions]].tolist(), values[positions].tolist(), fmt)
+            elif layout == "category":
+                codes, values = parts
+                columns[name] = values[codes[positions]].tolist()
+            else:
+                values, nulls, kind = parts
+                picked = values[positions].tolist()
+                if nulls is not None:
+                    kind = kind or int
+                    picked = [None if null else kind(v) for v, null in zip(picked, nulls[positions].tolist())]
+                elif kind is not None:
+                    picked = [kind(v) for v in picked]
+                columns[name] = picked
+        return columns
+
+
+def records(table: BookTable, positions) -> list:
+    """Serializa apenas as linhas pedidas (posições ou slice) como dicts do schema Book."""
+    columns = table.take(positions)
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def books_json(table: BookTable, positions) -> bytes:
+    """
+    Mesmo corpo de uma resposta List[Book], sem validação nem jsonable_encoder.
+    As linhas ainda viram dicts: codificar valor a valor a partir das colunas
+    saiu mais lento, tanto com orjson quanto com o json da stdlib.
+    """
+    rows = records(table, positions)
+    if orjson is not None:
+        return orjson.dumps(rows)
+    return json.dumps(rows, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
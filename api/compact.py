@@ -0,0 +1,154 @@
+# api/compact.py
+"""
+Representação compacta da tabela de livros em memória.
+- category vira categórica (um código por linha + lista de categorias)
+- price e availability deixam de existir como texto: ficam price_num e stock
+  mais um molde categórico ("Â£{}", "In stock ({} available)")
+- image_url e book_url viram molde com o host ("https://books.toscrape.com/{}")
+  mais o caminho
+- colunas inteiras usam o menor dtype que comporta os valores
+Os textos do schema Book são remontados só na serialização e só para as linhas
+pedidas (api.catalog.BookTable). A remontagem é exata: linhas que não seguem o
+molde guardam o texto original como molde; se nem isso for possível, a coluna
+fica como texto.
+
+Uso: python -m api.compact   (relatório de memória de DATA_PATH)
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+
+PLACEHOLDER = "{}"
+# esquema + host da URL ("https://books.toscrape.com/")
+URL_PATTERN = r"^([a-zA-Z][a-zA-Z0-9+.-]*://[^/]*/)?(.*)$"
+
+# campo texto -> (coluna com o valor, formatação do valor no texto)
+ENCODED = {
+    "price": ("price_num", "{:.2f}".format),
+    "availability": ("stock", str),
+    "image_url": ("image_url_path", str),
+    "book_url": ("book_url_path", str),
+}
+# padrões do número dentro do texto; linhas em que o molde não remonta o texto exato
+# (ex.: "£1,234.56") guardam o texto original
+NUMBER_PATTERNS = {
+    "price": (r"-?\d+(?:\.\d+)?", PLACEHOLDER),
+    "availability": (r"\(\d+ available\)", f"({PLACEHOLDER} available)"),
+}
+
+
+def template_column(name: str) -> str:
+    return f"{name}_fmt"
+
+
+def is_encoded(df: pd.DataFrame, name: str) -> bool:
+    return template_column(name) in df.columns
+
+
+def rebuild(templates: list, values: list, fmt) -> list:
+    return [
+        None if t is None else t.replace(PLACEHOLDER, fmt(v), 1)
+        for t, v in zip(templates, values)
+    ]
+
+
+def _objects(col: pd.Series) -> list:
+    # nulos (NaN/None) viram None
+    return col.astype(object).where(col.notna(), None).tolist()
+
+
+def _encode(strings: pd.Series, templates: pd.Series, values: pd.Series, fmt):
+    """Moldes categóricos que remontam `strings` exatamente, ou None se não houver como."""
+    rebuilt = pd.Series(rebuild(_objects(templates), values.tolist(), fmt), index=strings.index, dtype=object)
+    ok = (rebuilt == strings) | (strings.isna() & templates.isna())
+    # linhas fora do molde guardam o próprio texto (sem PLACEHOLDER, senão seriam ambíguas)
+    templates = templates.where(ok, strings)
+    if strings[~ok].astype(str).str.contains(PLACEHOLDER, regex=False).any():
+        return None
+    return templates.astype("category")
+
+
+def compact_books(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame normalizado por prepare_books -> forma compacta (novo DataFrame)."""
+    out = {}
+    for name in df.columns:
+        col = df[name]
+        if name == "category":
+            out[name] = col.astype("category")
+        elif pd.api.types.is_integer_dtype(col.dtype):
+            out[name] = pd.to_numeric(col, downcast="integer")
+        else:
+            out[name] = col
+
+    for name, (value_name, fmt) in ENCODED.items():
+        if name not in df.columns:
+            continue
+        strings = df[name]
+        text = strings.astype("string")
+        if name in NUMBER_PATTERNS:
+            pattern, repl = NUMBER_PATTERNS[name]
+            values = out[value_name]
+            templates = text.str.replace(pattern, repl, n=1, regex=True).astype(object)
+        else:
+            parts = text.str.extract(URL_PATTERN)
+            values = parts[1].astype(object)
+            templates = (parts[0].fillna("") + PLACEHOLDER).where(strings.notna()).astype(object)
+        encoded = _encode(strings, templates, values, fmt)
+        if encoded is None:
+            continue  # fica como texto
+        del out[name]
+        out[template_column(name)] = encoded
+        if value_name not in out:
+            out[value_name] = values.where(strings.notna())
+    return pd.DataFrame(out)
+
+
+def text_column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Coluna de texto para filtros: o molde quando codificada (ex.: "In stock" em availability)."""
+    return df[template_column(name)] if is_encoded(df, name) else df[name]
+
+
+def owned_bytes(arr: np.ndarray) -> int:
+    """Bytes de um array que não é view de outro (colunas do DataFrame/mmap não contam de novo)."""
+    return arr.nbytes if arr.flags.owndata else 0
+
+
+def strings_bytes(values) -> int:
+    """Lista de str (ou None): a lista mais cada objeto str."""
+    return sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values if v is not None)
+
+
+def memory_report(df: pd.DataFrame, indexes: dict | None = None) -> dict:
+    """
+    Bytes por coluna (incluindo os objetos str) da tabela e, se passados, de cada
+    índice montado sobre ela ({nome: bytes}); total_bytes soma tudo.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    columns = {name: int(n) for name, n in usage.items()}
+    indexes = {name: int(n) for name, n in (indexes or {}).items()}
+    table = int(usage.sum())
+    return {"rows": len(df), "table_bytes": table, "indexes": indexes,
+            "total_bytes": table + sum(indexes.values()), "columns": columns}
+
+
+def _sizes(values: dict) -> str:
+    return ", ".join(f"{name}={n / 1024:.0f}KB" for name, n in sorted(values.items(), key=lambda item: -item[1]))
+
+
+def format_report(report: dict) -> str:
+    text = (f"{report['total_bytes'] / 2**20:.1f} MB em {report['rows']} linhas: "
+            f"tabela {report['table_bytes'] / 2**20:.1f} MB ({_sizes(report['columns'])})")
+    if report["indexes"]:
+        text += f"; índices {_sizes(report['indexes'])}"
+    return text
+
+
+if __name__ == "__main__":
+    from api.config import settings
+    from api.utils import prepare_books
+
+    original = prepare_books(pd.read_csv(settings.DATA_PATH))
+    compact = compact_books(original)
+    print("original:", format_report(memory_report(original)))
+    print("compacto:", format_report(memory_report(compact)))
@@ -0,0 +1,210 @@
+# api/concurrency.py
+"""
+Execução dos endpoints pesados (pandas, serialização de listas, predições em
+lote) fora do event loop e do threadpool padrão do Starlette.
+- um executor dedicado, com HEAVY_WORKERS threads, compartilhado pelos endpoints pesados
+- por endpoint, no máximo N execuções simultâneas e uma fila limitada; quem
+  passa do limite ou espera demais na fila recebe 503 com Retry-After
+Endpoints baratos (health, livro por id) ficam `async def` no event loop e
+não disputam essas threads, então a latência deles não sobe sob carga mista.
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from api.config import settings
+from api.metrics import metrics
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(settings.HEAVY_WORKERS, 1), thread_name_prefix="heavy")
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def parse_limits(spec: str) -> dict:
+    """HEAVY_LIMITS ("search_books=4:32,predict=1:4") -> {nome: (concorrência, fila)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        concurrency, _, queue = values.partition(":")
+        limits[name.strip()] = (int(concurrency), int(queue or settings.HEAVY_MAX_QUEUE))
+    return limits
+
+
+class EndpointLimit:
+    """Até `max_concurrent` execuções do endpoint e `max_queue` esperando; o excedente recebe 503."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout = queue_timeout
+        self.pending = 0  # executando + na fila (alterado só no event loop)
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # o semáforo pertence a um event loop; recria se o app rodar em outro (ex.: testes)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    def _shed(self, reason: str) -> HTTPException:
+        metrics.inc("books_api_shed_total", help="Requisições recusadas com 503 por sobrecarga",
+                    endpoint=self.name, reason=reason)
+        return HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": str(settings.RETRY_AFTER_SECONDS)},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        slots = self._semaphore()
+        if self.pending >= self.max_concurrent + self.max_queue:
+            raise self._shed("queue_full")
+        self.pending += 1
+        try:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._shed("queue_timeout")
+            metrics.observe("books_api_queue_wait_seconds", time.perf_counter() - started,
+                            "Espera na fila dos endpoints pesados", endpoint=self.name)
+            try:
+                yield
+            finally:
+                slots.release()
+        finally:
+            self.pending -= 1
+
+
+_limits: dict = {}
+
+
+def endpoint_limit(name: str) -> EndpointLimit:
+    if name not in _limits:
+        overrides = parse_limits(settings.HEAVY_LIMITS)
+        concurrency, queue = overrides.get(name, (settings.HEAVY_MAX_CONCURRENCY, settings.HEAVY_MAX_QUEUE))
+        _limits[name] = EndpointLimit(name, concurrency, queue, settings.HEAVY_QUEUE_TIMEOUT)
+    return _limits[name]
+
+
+async def run_in_executor(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def offload(name: str, fn, *args, **kwargs):
+    """Roda fn(*args, **kwargs) no executor dedicado, sob o limite do endpoint `name`."""
+    async with endpoint_limit(name).slot():
+        return await run_in_executor(fn, *args, **kwargs)
+
+
+async def stream_response(name: str, fn, *args, **kwargs) -> StreamingResponse:
+    """
+    Streaming sob o limite do endpoint `name`: fn (no executor) devolve um
+    TableStream; cada lote também é gerado no executor e a vaga fica ocupada
+    até o fim do envio (ou a desconexão do cliente).
+    """
+    stack = AsyncExitStack()
+    await stack.enter_async_context(endpoint_limit(name).slot())
+    try:
+        stream = await run_in_executor(fn, *args, **kwargs)
+    except BaseException:
+        await stack.aclose()
+        raise
+    return StreamingResponse(_batches(stream.body, stack), media_type=stream.media_type, headers=stream.headers)
+
+
+_END = object()
+
+
+async def _batches(body, stack: AsyncExitStack):
+    try:
+        while (chunk := await run_in_executor(next, body, _END)) is not _END:
+            yield chunk
+    finally:
+        await stack.aclose()
+
+
+def parse_body(adapter: TypeAdapter, body: bytes):
+    """Valida um corpo JSON (no executor); erros viram o mesmo 422 do FastAPI."""
+    # mesmos passos do FastAPI (corpo vazio = ausente, json.loads, validação com
+    # from_attributes), para os erros terem exatamente o mesmo formato
+    if not body:
+        error = ValidationError.from_exception_data(
+            "Field required", [{"type": "missing", "loc": ("body",), "input": {}}]
+        ).errors()[0]
+        raise RequestValidationError([{**error, "input": None}], body=None)
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+            "input": {}, "ctx": {"error": e.msg},
+        }], body=e.doc) from e
+    try:
+        return adapter.validate_python(data, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()], body=data)
+
+
+def json_response(adapter: TypeAdapter, result, kwargs: Optional[dict] = None) -> Response:
+    """Valida `result` no response_model e gera o JSON (o que o FastAPI faria no event loop)."""
+    response = Response(adapter.dump_json(adapter.validate_python(result)), media_type="application/json")
+    # headers definidos no Response injetado (ex.: X-Next-Cursor) não se perdem
+    for value in (kwargs or {}).values():
+        if isinstance(value, Response):
+            for key, header in value.headers.items():
+                response.headers[key] = header
+    return response
+
+
+def heavy(name: str, response_model=None):
+    """
+    Transforma um handler síncrono em async que roda no executor dedicado,
+    sob o limite de concorrência do endpoint `name`. A assinatura é mantida,
+    então o FastAPI resolve parâmetros e dependências normalmente.
+    Com `response_model` a validação e o JSON também são feitos no executor
+    (em handlers async o FastAPI faria isso no event loop).
+    """
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    def decorator(fn):
+        def run(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            if adapter is None or isinstance(result, Response):
+                return result
+            return json_response(adapter, result, kwargs)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await offload(name, run, *args, **kwargs)
+        return wrapper
+    return decorator
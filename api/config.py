@@ -9,7 +9,25 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     # --- Caminhos e configurações gerais ---
     DATA_PATH: str = "data/books.csv"
+    DATA_RELOAD_INTERVAL: float = 5.0  # segundos entre verificações de nova versão (0 desativa)
     SCRAPER_BASE_URL: str = "https://books.toscrape.com/"
+    SCRAPER_MAX_CONCURRENCY: int = 8   # downloads simultâneos
+    SCRAPER_RATE_LIMIT: float = 10.0   # requisições/s por host (0 = sem limite)
+    SCRAPER_CACHE_DIR: str = "data/.page_cache"  # cache de páginas ("" desativa)
+    SCRAPER_PARSER: str = "auto"  # auto, selectolax, lxml ou bs4
+    SCRAPER_PARSE_WORKERS: int = 0  # processos de parse (0 = parse no próprio processo)
+    SCRAPER_PARSE_QUEUE_SIZE: int = 64  # parses pendentes antes de pausar os downloads
+    SCRAPER_JOBS_DIR: str = "data/.scrape_jobs"  # estado/progresso dos jobs de scraping
+    SCRAPER_SCHEDULE_MINUTES: float = 0  # scrape periódico (0 desativa)
+    SEARCH_CACHE_SIZE: int = 256  # resultados de busca guardados para paginação (0 desativa)
+    HEAVY_WORKERS: int = 4  # threads do executor dos endpoints pesados
+    HEAVY_MAX_CONCURRENCY: int = 2  # execuções simultâneas por endpoint pesado
+    HEAVY_MAX_QUEUE: int = 16  # requisições esperando por endpoint antes do 503
+    HEAVY_QUEUE_TIMEOUT: float = 5.0  # espera máxima na fila (s) antes do 503
+    HEAVY_LIMITS: str = ""  # por endpoint, ex.: "search_books=4:32,predict=1:4" (concorrência:fila)
+    RETRY_AFTER_SECONDS: int = 1  # header Retry-After das respostas 503
+    FAST_JSON: bool = False  # listas de livros codificadas sem o response_model (orjson se instalado)
+    PROFILER_ENABLED: bool = False  # libera POST /api/v1/admin/profile
     LOG_LEVEL: str = "INFO"
     ENV: str = "development"
     PORT: int = 8000
@@ -22,6 +40,7 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "changeme"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 1440
+    AUTH_CACHE_SIZE: int = 1024  # tokens validados em cache (0 desativa)
 
     model_config = SettingsConfigDict(
         env_file=".env",
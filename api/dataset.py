@@ -0,0 +1,197 @@
+# api/dataset.py
+"""
+Provedor único do dataset em memória, compartilhado pelos routers (core e ML).
+O CSV é lido uma vez; colunas derivadas e índices são calculados na carga e
+ficam num snapshot imutável (Dataset). Uma recarga monta um novo snapshot e
+troca a referência atomicamente: requisições em andamento seguem com o antigo.
+Cada worker do uvicorn observa a versão do arquivo de dados (data_version) numa
+thread própria e recarrega em background quando o scraper publica uma nova.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+from api.config import settings
+from api.utils import load_data, data_version
+from api.aggregates import Aggregates
+from api.snapshot import read_aggregates, snapshot_path
+from api.compact import format_report, memory_report, text_column
+from api.search import SearchIndex
+from api.catalog import CatalogIndex
+from api.cache import response_cache
+from api.pagination import result_cache
+from api.price_model import CategoryPriceModel
+from api.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Snapshot imutável: nenhum handler deve alterar `df` ou `features` in-place."""
+    df: pd.DataFrame
+    features: pd.DataFrame  # colunas derivadas prontas para os endpoints de ML
+    search: SearchIndex
+    catalog: CatalogIndex
+    price_model: CategoryPriceModel
+    aggregates: Aggregates  # estatísticas (stats/*) e médias do modelo de preço
+    version: str
+    path: str
+    loaded_at: float
+    load_seconds: float
+    memory: Optional[dict] = None  # memory_report da tabela (bytes por coluna) e dos índices
+
+    @property
+    def size(self) -> int:
+        return len(self.df)
+
+
+def build_features(df: pd.DataFrame) -> pd.DataFrame:
+    # in_stock binário, rating/categoria preenchidos; price_num fica sem preencher
+    category = df["category"].astype("category")
+    if "Unknown" not in category.cat.categories:
+        category = category.cat.add_categories("Unknown")
+    # str.contains na categórica avalia só os moldes distintos, não cada linha
+    in_stock = text_column(df, "availability").str.contains("In stock", case=False, na=False)
+    # copy=False: id, título e preço são as mesmas colunas de df, sem cópia
+    return pd.DataFrame({
+        "id": df["id"],
+        "title": df["title"],
+        "price_num": df["price_num"],
+        "rating": df["rating"].fillna(0),
+        "category": category.fillna("Unknown"),
+        "in_stock": in_stock.astype(np.int8),
+    }, copy=False)
+
+
+def stored_aggregates(path: str, version: str) -> Optional[Aggregates]:
+    """Agregados mantidos pelo scraper no snapshot, se forem desta versão dos dados."""
+    data = read_aggregates(snapshot_path(path)) if path else None
+    if data is None or data.get("version") != version:
+        return None
+    return Aggregates.from_dict(data)
+
+
+def build_dataset(
+    df: pd.DataFrame,
+    version: str,
+    path: str = "",
+    started: Optional[float] = None,
+    aggregates: Optional[Aggregates] = None,
+) -> Dataset:
+    started = time.perf_counter() if started is None else started
+    with span("build_indexes"):
+        features = build_features(df)
+        search = SearchIndex(df)
+        catalog = CatalogIndex(df)
+        if aggregates is None:
+            # sem agregados prontos (CSV sem snapshot): calcula uma vez a partir das linhas
+            aggregates = Aggregates.from_frame(df)
+        price_model = CategoryPriceModel.from_aggregates(aggregates, version)
+    return Dataset(
+        df=df,
+        features=features,
+        search=search,
+        catalog=catalog,
+        price_model=price_model,
+        aggregates=aggregates,
+        version=version,
+        path=path,
+        loaded_at=time.time(),
+        load_seconds=time.perf_counter() - started,
+        memory=memory_report(df, {"search": search.memory_bytes(), "catalog": catalog.memory_bytes()}),
+    )
+
+
+class DatasetProvider:
+    def __init__(self):
+        self._current: Optional[Dataset] = None
+        # serializa as cargas; leitores nunca esperam por ele
+        self._load_lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._failed_version: Optional[str] = None
+
+    @property
+    def current(self) -> Optional[Dataset]:
+        return self._current
+
+    def load(self, path: str | None = None) -> Dataset:
+        """Lê o arquivo, monta um novo snapshot e troca atomicamente."""
+        path = path or settings.DATA_PATH
+        with self._load_lock:
+            started = time.perf_counter()
+            version = data_version(path)
+            with span("dataset_load"):
+                with span("read_data"):
+                    df = load_data(path)
+                dataset = build_dataset(df, version, path, started, stored_aggregates(path, version))
+            # troca de referência atômica; quem já leu o snapshot antigo continua com ele
+            self._current = dataset
+        response_cache.clear()
+        result_cache.clear()
+        logger.info("Dataset %s carregado: %d registros em %.2fs", version, dataset.size, dataset.load_seconds)
+        # para dimensionar a memória de cada worker
+        logger.info("Memória do dataset: %s", format_report(dataset.memory))
+        return dataset
+
+    def reload_if_changed(self, path: str | None = None) -> bool:
+        """Recarrega se a versão publicada no disco mudou. Falhas mantêm o snapshot atual."""
+        current = self._current
+        path = path or (current.path if current else settings.DATA_PATH)
+        try:
+            version = data_version(path)
+        except OSError:
+            return False
+        if (current is not None and current.version == version) or version == self._failed_version:
+            return False
+        try:
+            self.load(path)
+        except Exception as e:
+            # não tenta de novo a mesma versão a cada intervalo
+            self._failed_version = version
+            logger.error("Erro ao recarregar dados (%s): %s", version, str(e))
+            return False
+        self._failed_version = None
+        return True
+
+    def watch(self, interval: float, path: str | None = None) -> None:
+        """Inicia a thread que verifica a versão do arquivo a cada `interval` segundos."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.reload_if_changed(path)
+
+        self._watcher = threading.Thread(target=run, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def get(self) -> Optional[Dataset]:
+        """Snapshot atual; tenta carregar uma vez se ainda não houver nenhum."""
+        dataset = self._current
+        if dataset is not None:
+            return dataset
+        with self._load_lock:
+            if self._current is not None:
+                return self._current
+            try:
+                return self.load()
+            except Exception as e:
+                logger.error("Erro ao carregar dados: %s", str(e))
+                return None
+
+
+# instância compartilhada por api.main e api.ml
+dataset_provider = DatasetProvider()
@@ -0,0 +1,123 @@
+# api/export.py
+"""
+Exportação em streaming das tabelas de ML (NDJSON, CSV e Arrow IPC).
+As linhas são geradas em lotes direto das colunas do snapshot, então a memória
+do servidor fica proporcional ao lote e não ao dataset. O cliente retoma um
+download interrompido com `offset` (linhas já recebidas) e `version`.
+"""
+
+import io
+from typing import Iterator, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from api.dataset import Dataset
+
+try:  # pyarrow é opcional (só para format=arrow)
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+DEFAULT_BATCH_SIZE = 5000
+MAX_BATCH_SIZE = 100_000
+
+
+def select_positions(
+    ds: Dataset,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+) -> np.ndarray:
+    """Posições (iloc) das linhas que passam nos filtros, em ordem crescente."""
+    positions = ds.search.search(None, category, min_price, max_price)
+    if min_rating is not None:
+        positions = positions[ds.features["rating"].to_numpy()[positions] >= min_rating]
+    if in_stock is not None:
+        positions = positions[ds.features["in_stock"].to_numpy()[positions] == int(in_stock)]
+    return positions
+
+
+def _ndjson_batches(empty: pd.DataFrame, chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8")
+
+
+def _csv_batches(empty: pd.DataFrame, chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    yield empty.to_csv(index=False).encode("utf-8")
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _arrow_batches(empty: pd.DataFrame, chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    schema = pa.Schema.from_pandas(empty, preserve_index=False)
+    sink = io.BytesIO()
+    with pa_ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # marcador de fim do stream
+    yield sink.getvalue()
+
+
+_WRITERS = {"ndjson": _ndjson_batches, "csv": _csv_batches, "arrow": _arrow_batches}
+
+
+class TableStream(NamedTuple):
+    body: Iterator[bytes]  # síncrono: cada next() gera um lote (api.concurrency.stream_response)
+    media_type: str
+    headers: dict
+
+
+def stream_table(
+    ds: Dataset,
+    frame: pd.DataFrame,
+    positions: np.ndarray,
+    fmt: str = "ndjson",
+    columns: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    version: Optional[str] = None,
+    fill: Optional[dict] = None,
+) -> TableStream:
+    """Stream de `frame` restrito a `positions`, a partir de `offset`."""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {fmt} (use {', '.join(FORMATS)})")
+    if fmt == "arrow" and pa is None:
+        raise HTTPException(status_code=501, detail="Formato arrow requer pyarrow instalado")
+    if version is not None and version != ds.version:
+        # as posições mudam entre versões: retomar exigiria recomeçar do zero
+        raise HTTPException(status_code=409, detail=f"Versão do dataset mudou (atual: {ds.version})")
+
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(frame.columns)
+    unknown = [c for c in selected if c not in frame.columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Colunas inválidas: {', '.join(unknown)}")
+    # seleção por posição dentro de cada lote (frame[selected] copiaria as colunas inteiras)
+    col_idx = frame.columns.get_indexer(selected)
+
+    total = len(positions)
+    end = total if limit is None else min(total, offset + limit)
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    batches = (positions[i:min(i + batch_size, end)] for i in range(offset, end, batch_size))
+    # cada lote é copiado das colunas só no momento de ser enviado
+    chunks = (frame.iloc[batch, col_idx] for batch in batches)
+    if fill:
+        chunks = (chunk.fillna(fill) for chunk in chunks)
+
+    headers = {
+        "X-Dataset-Version": ds.version,
+        "X-Total-Count": str(total),
+        "X-Offset": str(offset),
+    }
+    return TableStream(_WRITERS[fmt](frame.iloc[:0, col_idx], chunks), FORMATS[fmt], headers)
@@ -0,0 +1,233 @@
+# api/jobs.py
+"""
+Jobs de scraping em processo separado.
+- single-flight: um lock de arquivo (fcntl) garante um scrape por vez, mesmo
+  com vários workers do uvicorn; quem chega depois recebe o job em andamento
+- o crawl roda num processo filho (spawn, prioridade reduzida), sem disputar
+  a CPU e o GIL com os handlers da API
+- estado e progresso de cada job ficam em JSON em SCRAPER_JOBS_DIR, então
+  qualquer worker responde aos endpoints de status
+- agendamento opcional a cada SCRAPER_SCHEDULE_MINUTES
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+from api.config import settings
+from api.dataset import dataset_provider
+
+try:  # lock entre processos (indisponível no Windows: vale só dentro do processo)
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "scrape.lock"
+# intervalo mínimo entre gravações de progresso pelo processo filho
+PROGRESS_INTERVAL = 1.0
+FINISHED = ("succeeded", "failed")
+
+
+def _write_job(jobs_dir: str, job: dict) -> dict:
+    fd, tmp = tempfile.mkstemp(dir=jobs_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(jobs_dir, f"{job['id']}.json"))
+    return job
+
+
+def read_job(jobs_dir: str, job_id: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(jobs_dir, f"{os.path.basename(job_id)}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_jobs(jobs_dir: str, limit: int = 20) -> list:
+    """Jobs mais recentes primeiro."""
+    try:
+        names = [n for n in os.listdir(jobs_dir) if n.endswith(".json")]
+    except OSError:
+        return []
+    jobs = [job for job in (read_job(jobs_dir, n[:-5]) for n in names) if job]
+    jobs.sort(key=lambda j: j["created_at"], reverse=True)
+    return jobs[:limit]
+
+
+def _run_job(jobs_dir: str, job: dict, scrape_kwargs: dict):
+    """Corpo do processo filho: roda o scraper e grava o progresso no arquivo do job."""
+    if hasattr(os, "nice"):
+        os.nice(10)
+    job["pid"] = os.getpid()
+    _write_job(jobs_dir, job)
+    from scripts.scrape_books import scrape_all_books
+
+    started = time.time()
+    last_write = 0.0
+    latest: dict = {}
+
+    def progress(stats: dict, force: bool = False):
+        nonlocal last_write, latest
+        latest = stats
+        now = time.time()
+        if not force and now - last_write < PROGRESS_INTERVAL:
+            return
+        last_write = now
+        elapsed = now - started
+        job["progress"] = {**stats, "elapsed": round(elapsed, 2),
+                           "pages_per_sec": round(stats.get("pages", 0) / elapsed, 2) if elapsed else 0.0}
+        _write_job(jobs_dir, job)
+
+    try:
+        books = scrape_all_books(progress=progress, **scrape_kwargs)
+    except Exception as e:
+        job.update(status="failed", error=str(e), finished_at=time.time())
+        _write_job(jobs_dir, job)
+        raise
+    progress({**latest, "books": len(books)}, force=True)
+    job.update(status="succeeded", finished_at=time.time(), result={"books": len(books)})
+    _write_job(jobs_dir, job)
+
+
+class ScrapeJobManager:
+    def __init__(self, jobs_dir: str):
+        self.jobs_dir = jobs_dir
+        self._lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._process = None
+        self._monitor: Optional[threading.Thread] = None
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _acquire(self) -> bool:
+        """Lock do scrape: dentro do processo e, se possível, entre processos."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.jobs_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._lock.release()
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _release(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # fechar o descritor libera o flock
+            self._lock_fd = None
+        self._lock.release()
+
+    def running(self) -> Optional[dict]:
+        return next((job for job in list_jobs(self.jobs_dir) if job["status"] not in FINISHED), None)
+
+    def start(self, trigger: str = "manual", **scrape_kwargs) -> tuple[dict, bool]:
+        """Inicia um job; se já houver um rodando (em qualquer worker), devolve ele com False."""
+        if not self._acquire():
+            job = self.running()
+            if job is None:
+                # lock ocupado mas o arquivo do job ainda não foi gravado
+                job = {"id": None, "status": "running", "trigger": trigger}
+            return job, False
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            self._mark_interrupted()
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "trigger": trigger,
+                "status": "running",
+                "pid": None,
+                "created_at": time.time(),
+                "finished_at": None,
+                "progress": {},
+                "result": None,
+                "error": None,
+            }
+            # spawn: o processo da API tem threads, fork não é seguro.
+            # Não é daemon para poder abrir o pool de parse (SCRAPER_PARSE_WORKERS)
+            process = multiprocessing.get_context("spawn").Process(
+                target=_run_job, args=(self.jobs_dir, job, scrape_kwargs), name=f"scrape-{job['id']}"
+            )
+            _write_job(self.jobs_dir, job)
+            process.start()
+            self._process = process
+        except Exception:
+            self._release()
+            raise
+        self._monitor = threading.Thread(target=self._wait, args=(process, job["id"]), daemon=True)
+        self._monitor.start()
+        logger.info("Job de scraping %s iniciado (%s, pid %s)", job["id"], trigger, process.pid)
+        return job, True
+
+    def _wait(self, process, job_id: str):
+        process.join()
+        try:
+            job = read_job(self.jobs_dir, job_id)
+            if job is not None and job["status"] not in FINISHED:
+                job.update(status="failed", error=f"processo terminou com código {process.exitcode}",
+                           finished_at=time.time())
+                _write_job(self.jobs_dir, job)
+            logger.info("Job de scraping %s terminou: %s", job_id, job and job["status"])
+        finally:
+            self._release()
+        # este worker troca na hora; os demais percebem a nova versão pelo watcher
+        dataset_provider.reload_if_changed()
+
+    def _mark_interrupted(self):
+        # com o lock em mãos, jobs ainda "running" são de processos que morreram
+        for job in list_jobs(self.jobs_dir, limit=5):
+            if job["status"] not in FINISHED:
+                job.update(status="failed", error="interrompido", finished_at=job.get("finished_at") or time.time())
+                _write_job(self.jobs_dir, job)
+
+    def join(self, timeout: Optional[float] = None):
+        """Espera o job iniciado por este processo (usado em testes e no shutdown)."""
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+
+    def schedule(self, minutes: float, **scrape_kwargs):
+        """Dispara um scrape quando o último terminou há mais de `minutes` minutos."""
+        if minutes <= 0 or self._scheduler is not None:
+            return
+        interval = minutes * 60
+        scheduled_at = time.time()
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(min(interval, 60.0)):
+                try:
+                    last = next((j for j in list_jobs(self.jobs_dir) if j.get("finished_at")), None)
+                    if time.time() - (last["finished_at"] if last else scheduled_at) >= interval:
+                        self.start("scheduled", **scrape_kwargs)
+                except Exception:
+                    # uma falha (lock, spawn, disco) não pode matar o agendador: tenta no próximo intervalo
+                    logger.exception("Falha ao disparar scrape agendado")
+
+        self._scheduler = threading.Thread(target=run, name="scrape-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def shutdown(self, timeout: float = 5.0):
+        """Para o agendador e encerra um scrape iniciado por este processo."""
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+            self._scheduler = None
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+        self.join(timeout)
+
+
+# instância compartilhada pelos endpoints de scraping
+scrape_jobs = ScrapeJobManager(settings.SCRAPER_JOBS_DIR)
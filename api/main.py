@@ -6,15 +6,25 @@ FastAPI principal. Registra routers:
 - endpoints core (books, categories, stats)
 """
 
+from datetime import datetime, timezone
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 import logging
 from api.config import settings
-from api.schemas import Book, Health
-from api.utils import load_data
-from api.auth import get_current_user  # dependência para proteger rotas
+from api.schemas import Book, BulkRequest, BulkResponse, Health
+from api.cache import response_cache
+from api.catalog import books_json, records
+from api.concurrency import heavy, shutdown_executor
+from api.dataset import Dataset, dataset_provider
+from api.jobs import scrape_jobs, read_job, list_jobs
+from api.metrics import MetricsMiddleware, metrics, span
+from api.pagination import CURSOR_HEADER, decode_cursor, next_cursor, result_cache, validate_sort
+from api import profiler
+from api.auth import get_current_user, token_cache  # dependência para proteger rotas
 from api import auth  # importa módulo para registrar router
 from api import ml as ml_router  # importa router de ML
+import numpy as np
 import pandas as pd
 
 # registrar logging
@@ -27,121 +37,275 @@ app = FastAPI(title="Books API", version="1.1")
 app.include_router(auth.router)
 app.include_router(ml_router.router)
 
-# variável global com o dataframe
-BOOKS_DF = None
+# latência e status por rota, expostos em /metrics
+app.add_middleware(MetricsMiddleware)
+
+metrics.gauge("books_api_dataset_rows", lambda: ds.size if (ds := dataset_provider.current) else None,
+              "Registros no dataset ativo")
+metrics.gauge("books_api_dataset_load_seconds", lambda: ds.load_seconds if (ds := dataset_provider.current) else None,
+              "Duração da última carga do dataset")
+metrics.gauge("books_api_dataset_memory_bytes",
+              lambda: ds.memory["total_bytes"] if (ds := dataset_provider.current) and ds.memory else None,
+              "Memória do dataset ativo (tabela + índices)")
+metrics.gauge("books_api_auth_cache_hits", lambda: token_cache.hits, "Acertos do cache de tokens")
+metrics.gauge("books_api_auth_cache_misses", lambda: token_cache.misses, "Faltas do cache de tokens")
 
 @app.on_event("startup")
 def startup_event():
-    global BOOKS_DF
     try:
-        BOOKS_DF = load_data(settings.DATA_PATH)
-        logger.info("Dados carregados: %d registros", BOOKS_DF.shape[0])
+        dataset_provider.load(settings.DATA_PATH)
     except Exception as e:
         logger.error("Erro ao carregar dados: %s", str(e))
-        BOOKS_DF = None
+    # recarrega em background quando o scraper (de qualquer processo) publica nova versão
+    dataset_provider.watch(settings.DATA_RELOAD_INTERVAL, settings.DATA_PATH)
+    scrape_jobs.schedule(settings.SCRAPER_SCHEDULE_MINUTES)
+
+@app.on_event("shutdown")
+def shutdown_event():
+    dataset_provider.stop_watching()
+    scrape_jobs.shutdown()
+    shutdown_executor()
+
+# snapshot atual do dataset (compartilhado com o router de ML)
+def get_dataset() -> Dataset:
+    ds = dataset_provider.get()
+    if ds is None:
+        raise HTTPException(status_code=500, detail="Dados não carregados")
+    return ds
+
+# rotas async (event loop): só o snapshot já carregado; a carga, lenta, nunca roda no loop
+def loaded_dataset() -> Dataset:
+    ds = dataset_provider.current
+    if ds is None:
+        raise HTTPException(status_code=503, detail="Dados ainda não carregados",
+                            headers={"Retry-After": str(settings.RETRY_AFTER_SECONDS)})
+    return ds
+
+# listas de livros: com FAST_JSON o corpo é codificado sem o response_model (mesmo conteúdo do List[Book])
+def _books_response(ds: Dataset, positions, response: Optional[Response] = None, cursor: Optional[str] = None):
+    with span("serialize"):
+        if settings.FAST_JSON:
+            response = Response(books_json(ds.catalog.table, positions), media_type="application/json")
+            body = response
+        else:
+            body = records(ds.catalog.table, positions)
+    if cursor is not None and response is not None:
+        response.headers[CURSOR_HEADER] = cursor
+    return body
+
+# página de `ordered` (posições já filtradas/ordenadas) a partir do cursor ou de `skip`
+def _page(ds: Dataset, ordered, query: tuple, limit: int, response: Response,
+          cursor: Optional[str] = None, skip: int = 0):
+    start = decode_cursor(cursor, ds.version, query) if cursor else max(skip, 0)
+    end = start + max(limit, 0)
+    page = ordered[start:end]
+    return _books_response(ds, page, response, next_cursor(ds.version, query, end, len(ordered)))
+
+# Endpoints baratos (raiz, health, livro por id, stats, /metrics) são async e rodam no
+# event loop; os que varrem ou serializam muitas linhas usam @heavy (executor
+# dedicado, com limite de concorrência e 503 quando a fila enche).
 
 # rota raiz para teste/status
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "API de livros está rodando!"}
 
 # endpoint de health-check
 @app.get("/api/v1/health", response_model=Health)
-def health():
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    return {"status": "ok", "items": int(BOOKS_DF.shape[0])}
+async def health():
+    ds = loaded_dataset()
+    return {"status": "ok", "items": ds.size}
 
-# listar livros (paginação simples via skip/limit)
+# listar livros (skip/limit ou cursor; X-Next-Cursor traz a próxima página)
 @app.get("/api/v1/books", response_model=List[Book])
-def list_books(skip: int = 0, limit: int = 100):
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    df = BOOKS_DF.iloc[skip: skip + limit]
-    return df.to_dict(orient="records")
+@heavy("list_books", response_model=List[Book])
+def list_books(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: Optional[str] = Query(None, description="price, rating ou title (prefixo - para decrescente)"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+):
+    ds = get_dataset()
+    sort_by = validate_sort(sort_by)
+    # ordens pré-computadas na carga: nada a filtrar nem ordenar por requisição
+    ordered = ds.catalog.orders[sort_by] if sort_by else range(ds.size)
+    return _page(ds, ordered, ("books", sort_by), limit, response, cursor, skip)
 
 # busca por título e/ou categoria e opção de faixa de preço
 @app.get("/api/v1/books/search", response_model=List[Book])
+@heavy("search_books", response_model=List[Book])
 def search_books(
+    response: Response,
     title: Optional[str] = Query(None, description="Parte do título para buscar (case-insensitive)"),
     category: Optional[str] = Query(None, description="Categoria para filtrar (case-insensitive)"),
     min_price: Optional[float] = Query(None, description="Preço mínimo em £"),
     max_price: Optional[float] = Query(None, description="Preço máximo em £"),
-    limit: int = 100
+    limit: int = 100,
+    sort_by: Optional[str] = Query(None, description="price, rating ou title (prefixo - para decrescente)"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
 ):
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    df = BOOKS_DF.copy()
-    if title:
-        df = df[df["title"].str.contains(title, case=False, na=False)]
-    if category:
-        df = df[df["category"].str.contains(category, case=False, na=False)]
-    if min_price is not None:
-        df = df[df["price_num"] >= min_price]
-    if max_price is not None:
-        df = df[df["price_num"] <= max_price]
-    return df.head(limit).to_dict(orient="records")
-
-# listar todas as categorias disponíveis
+    ds = get_dataset()
+    sort_by = validate_sort(sort_by)
+    query = ("search", title, category, min_price, max_price, sort_by)
+    positions = _search(ds, query)
+    return _page(ds, positions, query, limit, response, cursor)
+
+# posições (filtradas e ordenadas) de uma busca; o resultado inteiro fica em cache
+# e as páginas seguintes só fatiam o array
+def _search(ds: Dataset, query: tuple):
+    _, title, category, min_price, max_price, sort_by = query
+
+    def run_query():
+        # usa o índice pré-computado; só as linhas retornadas são materializadas
+        with span("search_filter"):
+            positions = ds.search.search(title, category, min_price, max_price)
+            return ds.catalog.sort(positions, sort_by) if sort_by else positions
+
+    return result_cache.get(ds.version, query, run_query)
+
+# vários ids e buscas numa requisição: uma única materialização das linhas pedidas
+@app.post("/api/v1/books/bulk", response_model=BulkResponse)
+@heavy("bulk_books", response_model=BulkResponse)
+def bulk_books(body: BulkRequest):
+    ds = get_dataset()
+    found = ds.catalog.positions(body.ids)
+    missing = [book_id for book_id, pos in zip(body.ids, found.tolist()) if pos < 0]
+    parts, totals = [found[found >= 0]], []
+    for q in body.queries:
+        query = ("search", q.title, q.category, q.min_price, q.max_price, validate_sort(q.sort_by))
+        positions = _search(ds, query)
+        totals.append(len(positions))
+        parts.append(positions[:q.limit])
+
+    with span("serialize"):
+        rows = records(ds.catalog.table, np.concatenate(parts).astype(np.int64, copy=False))
+    books, start = rows[:len(parts[0])], len(parts[0])
+    results = []
+    for total, part in zip(totals, parts[1:]):
+        results.append({"total": total, "books": rows[start:start + len(part)]})
+        start += len(part)
+    return {"books": books, "missing": missing, "queries": results}
+
+# listar todas as categorias disponíveis (resposta em cache até a próxima carga)
 @app.get("/api/v1/categories")
-def list_categories():
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    cats = BOOKS_DF["category"].dropna().unique().tolist()
-    return {"categories": sorted(cats)}
+async def list_categories(request: Request):
+    ds = loaded_dataset()
+    return response_cache.get("categories", ds.version, lambda: _categories(ds)).to_response(request)
+
+def _categories(ds: Dataset) -> dict:
+    return {"categories": sorted(ds.aggregates.categories)}
 
 # --- Endpoints opcionais de estatísticas (insights) ---
+# Saem dos agregados incrementais do dataset (api.aggregates): a resposta é
+# montada uma vez por versão, sem percorrer as linhas.
 @app.get("/api/v1/stats/overview")
-def stats_overview():
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-
-    df = BOOKS_DF.copy()
+async def stats_overview(request: Request):
+    ds = loaded_dataset()
+    return response_cache.get("stats_overview", ds.version, ds.aggregates.overview).to_response(request)
 
-    # Substitui NaN, infinidades e outros valores inválidos por None
-    df = df.replace([float("inf"), float("-inf")], None)
-    df = df.where(pd.notnull(df), None)
+@app.get("/api/v1/stats/categories")
+async def stats_categories(request: Request):
+    """Por categoria: preço (médio, mín., máx. e histograma), rating médio e estoque."""
+    ds = loaded_dataset()
+    return response_cache.get("stats_categories", ds.version, ds.aggregates.category_breakdown).to_response(request)
 
-    stats = {
-        "total_books": len(df),
-        "average_price": df["price_num"].mean(),
-        "min_price": df["price_num"].min(),
-        "max_price": df["price_num"].max(),
-        "categories_count": df["category"].nunique(),
-        "average_rating": df["rating"].mean(),
-    }
+@app.get("/api/v1/stats/ratings")
+async def stats_ratings(request: Request):
+    ds = loaded_dataset()
+    return response_cache.get("stats_ratings", ds.version, ds.aggregates.rating_distribution).to_response(request)
 
-    # Também converter NaN em None no dicionário final
-    stats = {k: (None if pd.isna(v) else v) for k, v in stats.items()}
-
-    return stats
+@app.get("/api/v1/stats/stock")
+async def stats_stock(request: Request):
+    ds = loaded_dataset()
+    return response_cache.get("stats_stock", ds.version, ds.aggregates.stock).to_response(request)
 
 @app.get("/api/v1/books/top-rated", response_model=List[Book])
-def top_rated(limit: int = 10):
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    df = BOOKS_DF.sort_values(by="rating", ascending=False)
-    return df.head(limit).to_dict(orient="records")
+@heavy("top_rated", response_model=List[Book])
+def top_rated(response: Response, limit: int = 10, cursor: Optional[str] = None):
+    ds = get_dataset()
+    # permutação por rating pré-computada: só as `limit` linhas da página são serializadas
+    return _page(ds, ds.catalog.rating_order, ("top-rated",), limit, response, cursor)
 
 # obter livro por id
 @app.get("/api/v1/books/{book_id}", response_model=Book)
-def get_book(book_id: int):
-    if BOOKS_DF is None:
-        raise HTTPException(status_code=500, detail="Dados não carregados")
-    df = BOOKS_DF[BOOKS_DF["id"] == book_id]
-    if df.empty:
+async def get_book(book_id: int):
+    ds = loaded_dataset()
+    pos = ds.catalog.position(book_id)
+    if pos is None:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
-    return df.iloc[0].to_dict()
-
-from scripts.scrape_books import scrape_all_books
+    return records(ds.catalog.table, [pos])[0]
 
-# Endpoint protegido: dispara scraping (executa em background)
+# Endpoint protegido: dispara scraping (job em processo separado)
 @app.post("/api/v1/scraping/trigger")
-def trigger_scraping(background_tasks: BackgroundTasks, user=Depends(get_current_user)):
+def trigger_scraping(user=Depends(get_current_user)):
     """
-    Endpoint protegido que dispara o scraping em background.
+    Endpoint protegido que dispara o scraping num processo separado.
+    Se já houver um scrape rodando (em qualquer worker), devolve o job atual.
     Requer token Bearer válido (admin).
     """
-    # adiciona a tarefa de scraping em background (não bloqueia a API)
-    background_tasks.add_task(scrape_all_books)
-    return {"status": "accepted", "detail": "Scraping em background iniciado"}
\ No newline at end of file
+    job, started = scrape_jobs.start("manual")
+    if not started:
+        return {"status": "already_running", "detail": "Já existe um scraping em andamento", "job": job}
+    return {"status": "accepted", "detail": "Scraping em background iniciado", "job": job}
+
+# status e progresso dos jobs (páginas/s, livros coletados, erros)
+@app.get("/api/v1/scraping/jobs")
+def scraping_jobs(limit: int = Query(20, ge=1, le=100), user=Depends(get_current_user)):
+    return {"jobs": list_jobs(settings.SCRAPER_JOBS_DIR, limit)}
+
+@app.get("/api/v1/scraping/jobs/{job_id}")
+def scraping_job(job_id: str, user=Depends(get_current_user)):
+    job = read_job(settings.SCRAPER_JOBS_DIR, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+def _dataset_info(ds: Dataset) -> dict:
+    return {
+        "version": ds.version,
+        "path": ds.path,
+        "rows": ds.size,
+        "loaded_at": datetime.fromtimestamp(ds.loaded_at, timezone.utc).isoformat(),
+        "load_seconds": round(ds.load_seconds, 4),
+        "memory": ds.memory,
+    }
+
+# Endpoints protegidos de administração do dataset
+@app.get("/api/v1/admin/dataset")
+def dataset_status(user=Depends(get_current_user)):
+    """Versão ativa do dataset e quanto tempo levou a carga."""
+    return _dataset_info(get_dataset())
+
+@app.get("/api/v1/admin/auth-cache")
+def auth_cache_status(user=Depends(get_current_user)):
+    """Acertos/faltas do cache de tokens validados."""
+    return token_cache.stats()
+
+# métricas no formato texto do Prometheus (por processo)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/v1/admin/profile")
+def sample_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    user=Depends(get_current_user),
+):
+    """
+    Amostra as pilhas das threads deste worker por `seconds` segundos e devolve
+    collapsed stacks (flamegraph.pl, speedscope). Desligado sem PROFILER_ENABLED.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler desativado (PROFILER_ENABLED)")
+    stacks = profiler.profile(seconds, interval_ms / 1000)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="Já existe um profile em andamento")
+    return PlainTextResponse(stacks)
+
+@app.post("/api/v1/admin/dataset/reload")
+def reload_dataset(user=Depends(get_current_user)):
+    """Recarrega se houver versão nova no disco (sem derrubar as requisições em andamento)."""
+    reloaded = dataset_provider.reload_if_changed(settings.DATA_PATH)
+    return {"reloaded": reloaded, **_dataset_info(get_dataset())}
\ No newline at end of file
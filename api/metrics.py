@@ -0,0 +1,149 @@
+# api/metrics.py
+"""
+Métricas da API em memória, expostas em /metrics no formato texto do Prometheus.
+- histograma de latência por rota (middleware em api.main)
+- spans internos de tempo por fase (filtro, serialização, carga do dataset)
+- gauges registrados por callback (tamanho do dataset, cache de tokens, ...)
+Os valores são por processo: com vários workers cada um expõe os seus.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# limites dos buckets em segundos (mesmos do client oficial do Prometheus)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._help: dict[str, str] = {}
+        self._gauges: dict[str, tuple[str, Callable[[], float | None]]] = {}
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(key, Histogram()).observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def gauge(self, name: str, fn: Callable[[], float | None], help: str = ""):
+        """Gauge lido na hora da coleta (sem estado próprio)."""
+        self._gauges[name] = (help, fn)
+
+    @contextmanager
+    def span(self, name: str):
+        """Mede uma fase interna: books_api_span_seconds{span=name}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("books_api_span_seconds", time.perf_counter() - start,
+                         "Duração das fases internas", span=name)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {self._help.get(name, '')}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_labels(key)} {value}" for key, value in sorted(series.items())]
+            for name, series in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {self._help.get(name, '')}", f"# TYPE {name} histogram"]
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {hist.count}")
+        for name, (help, fn) in sorted(self._gauges.items()):
+            value = fn()
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+# registro único do processo
+metrics = MetricsRegistry()
+span = metrics.span
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latência e status por rota (template, ex.: /api/v1/books/{book_id}).
+    Mede até o último pedaço do corpo, então respostas em streaming contam inteiras.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+        self._routes: dict = {}
+
+    def _route(self, scope) -> str:
+        if not self._routes and "app" in scope:
+            self._routes = {r.endpoint: r.path for r in scope["app"].routes if hasattr(r, "endpoint")}
+        # o router grava o endpoint escolhido no próprio scope
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            self.registry.observe("books_api_request_duration_seconds", time.perf_counter() - start,
+                                  "Latência das requisições por rota", method=scope["method"], route=route)
+            self.registry.inc("books_api_requests_total", help="Requisições por rota e status",
+                              method=scope["method"], route=route, status=str(status))
@@ -4,97 +4,153 @@ Endpoints pensados para consumo de modelos ML:
 - /api/v1/ml/features        -> features prontas (JSON)
 - /api/v1/ml/training-data  -> dataset pronto para treinar (CSV/JSON)
 - /api/v1/ml/predictions    -> recebe features e retorna predições (simulação)
+- /api/v1/ml/*/stream        -> exportação em lotes (NDJSON, CSV ou Arrow)
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import List, Dict, Any, Optional
 import pandas as pd
-from api.utils import load_data
-from pydantic import BaseModel
+from api.cache import response_cache
+from api.concurrency import endpoint_limit, heavy, json_response, parse_body, run_in_executor, stream_response
+from api.dataset import Dataset, dataset_provider
+from api.export import DEFAULT_BATCH_SIZE, select_positions, stream_table
+from pydantic import BaseModel, TypeAdapter
 from api.auth import get_current_user  # caso queira proteger endpoints ML, pode usar Depends
 
 router = APIRouter(prefix="/api/v1/ml", tags=["ml"])
 
+# snapshot em memória compartilhado com api.main (sem reler o CSV a cada chamada)
+def get_dataset() -> Dataset:
+    ds = dataset_provider.get()
+    if ds is None or ds.size == 0:
+        raise HTTPException(status_code=500, detail="Dados não disponíveis")
+    return ds
+
 # Endpoint que retorna as features já processadas (lista)
+# As respostas ficam em cache até a próxima carga do dataset
 @router.get("/features")
-def get_features():
-    df = load_data()
-    if df is None or df.empty:
-        raise HTTPException(status_code=500, detail="Dados não disponíveis")
-    # Exemplo de processamento básico de features:
-    features = df[["id", "title", "price_num", "rating", "category"]].copy()
-    # transforma availability em binário (0/1)
-    features["in_stock"] = df["availability"].str.contains("In stock", case=False, na=False).astype(int)
+@heavy("ml_features")
+def get_features(request: Request):
+    ds = get_dataset()
+    return response_cache.get("ml_features", ds.version, lambda: _build_features(ds)).to_response(request)
+
+def _build_features(ds: Dataset):
+    # features derivadas (in_stock, rating/categoria preenchidos) já vêm prontas no snapshot
+    features = ds.features[["id", "title", "price_num", "rating", "category", "in_stock"]]
     # preencher nulos
-    features = features.fillna({"price_num": 0.0, "rating": 0})
+    features = features.fillna({"price_num": 0.0})
     return features.to_dict(orient="records")
 
 # Endpoint que retorna dataset pronto para treino (JSON)
 @router.get("/training-data")
-def get_training_data():
-    df = load_data()
-    if df is None or df.empty:
-        raise HTTPException(status_code=500, detail="Dados não disponíveis")
+@heavy("ml_training_data")
+def get_training_data(request: Request):
+    ds = get_dataset()
+    return response_cache.get("ml_training_data", ds.version, lambda: _build_training_data(ds)).to_response(request)
+
+def _build_training_data(ds: Dataset):
     # Dataset de exemplo: price_num (target), rating, category (string), in_stock
-    data = pd.DataFrame({
-        "price_num": df["price_num"],
-        "rating": df["rating"].fillna(0),
-        "category": df["category"].fillna("Unknown"),
-        "in_stock": df["availability"].str.contains("In stock", case=False, na=False).astype(int)
-    })
+    data = ds.features[["price_num", "rating", "category", "in_stock"]]
     # Retorna JSON com colunas prontas
     return {"columns": list(data.columns), "records": data.to_dict(orient="records")}
 
+# Exportação em streaming: mesmas tabelas, geradas em lotes (memória constante) no
+# executor dos endpoints pesados; a vaga do endpoint fica ocupada até o fim do envio
+class ExportParams:
+    def __init__(
+        self,
+        format: str = Query("ndjson", description="ndjson, csv ou arrow"),
+        columns: Optional[str] = Query(None, description="Colunas separadas por vírgula"),
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        offset: int = Query(0, ge=0, description="Linhas já recebidas (retomada)"),
+        limit: Optional[int] = Query(None, ge=1),
+        batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1),
+        version: Optional[str] = Query(None, description="Versão esperada do dataset (X-Dataset-Version)"),
+    ):
+        self.format = format
+        self.columns = columns
+        self.filters = dict(
+            category=category, min_price=min_price, max_price=max_price, min_rating=min_rating, in_stock=in_stock
+        )
+        self.offset = offset
+        self.limit = limit
+        self.batch_size = batch_size
+        self.version = version
+
+def _stream(params: ExportParams, columns: Optional[str], fill: Optional[dict] = None):
+    ds = get_dataset()
+    return stream_table(
+        ds,
+        ds.features,
+        select_positions(ds, **params.filters),
+        fmt=params.format,
+        columns=columns,
+        offset=params.offset,
+        limit=params.limit,
+        batch_size=params.batch_size,
+        version=params.version,
+        fill=fill,
+    )
+
+@router.get("/features/stream")
+async def stream_features(params: ExportParams = Depends()):
+    return await stream_response("ml_features_stream", _stream, params, params.columns, fill={"price_num": 0.0})
+
+@router.get("/training-data/stream")
+async def stream_training_data(params: ExportParams = Depends()):
+    return await stream_response("ml_training_stream", _stream, params,
+                                 params.columns or "price_num,rating,category,in_stock")
+
 # Endpoint de predições - aqui fazemos uma predição simples (heurística)
-import math
+import numpy as np
 from api.schemas import PredictionRequestItem, PredictionResponseItem
 
-@router.post("/predictions", response_model=List[PredictionResponseItem])
-def predict(items: List[PredictionRequestItem]):
+_PREDICTION_ITEMS = TypeAdapter(List[PredictionRequestItem])
+_PREDICTIONS = TypeAdapter(List[PredictionResponseItem])
+
+@router.post(
+    "/predictions",
+    response_model=List[PredictionResponseItem],
+    # o corpo é lido cru e validado no executor; o schema continua documentado
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {
+        "schema": {"type": "array", "items": PredictionRequestItem.model_json_schema()}}}}},
+)
+async def predict(request: Request):
     """
     Faz predição de preço com base na categoria e rating.
     Aplica média de preço da categoria e ajusta conforme a nota.
     Garante que nenhum valor NaN ou inválido é retornado.
     """
-    df = load_data()
-    if df is None or df.empty:
-        raise HTTPException(status_code=500, detail="Dados não disponíveis")
-
-    # Garantir que a coluna price_num não tenha NaN
-    df["price_num"] = df["price_num"].fillna(df["price_num"].mean())
-    df = df[df["price_num"].notna()]
-
-    # Heurística simples: média de preços por categoria
-    mean_prices = df.groupby("category")["price_num"].mean().fillna(df["price_num"].mean()).to_dict()
-    default_mean = float(df["price_num"].mean())
-
-    # Se default_mean for NaN, substitui por 0.0
-    if math.isnan(default_mean) or math.isinf(default_mean):
-        default_mean = 0.0
-
-    results = []
-    for item in items:
-        cat = item.category or "Unknown"
-        base = mean_prices.get(cat, default_mean)
-
-        # Proteção contra NaN ou infinito
-        if base is None or math.isnan(base) or math.isinf(base):
-            base = default_mean
+    # lotes grandes: parse, validação, predição e JSON fora do event loop; com
+    # o endpoint saturado o 503 sai antes de ler o corpo
+    async with endpoint_limit("predict").slot():
+        body = await request.body()
+        return await run_in_executor(_predict, body)
 
-        rating = item.rating or 0.0
-        predicted = base * (1 + (rating - 3) * 0.03)
+def _predict(body: bytes):
+    items = parse_body(_PREDICTION_ITEMS, body)
+    model = get_dataset().price_model
 
-        # Limpeza final
-        if predicted is None or math.isnan(predicted) or math.isinf(predicted):
-            predicted = default_mean
+    # arrays do lote inteiro; o modelo já vem ajustado com a versão atual do dataset
+    categories = [item.category or "Unknown" for item in items]
+    ratings = np.fromiter((item.rating or 0.0 for item in items), dtype=np.float64, count=len(items))
+    predicted, base = model.predict(categories, ratings)
 
-        results.append({
-            "predicted_price": round(float(predicted), 2),
-            "details": {
-                "base": round(float(base), 2),
-                "rating": rating,
-                "category": cat
-            }
-        })
+    return json_response(_PREDICTIONS, [
+        {
+            "predicted_price": round(p, 2),
+            "details": {"base": round(b, 2), "rating": r, "category": c},
+        }
+        for p, b, r, c in zip(predicted.tolist(), base.tolist(), ratings.tolist(), categories)
+    ])
 
-    return results
\ No newline at end of file
+# Artefato do modelo atual (versão do dataset e médias por categoria)
+@router.get("/model")
+@heavy("ml_model")
+def get_model(request: Request):
+    ds = get_dataset()
+    return response_cache.get("ml_model", ds.version, ds.price_model.to_dict).to_response(request)
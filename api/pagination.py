@@ -0,0 +1,97 @@
+# api/pagination.py
+"""
+Paginação por cursor para listagem, busca e top-rated.
+O cursor é opaco (base64 de um JSON) e guarda a versão do dataset, um hash
+da consulta e a posição seguinte. O resultado completo de cada consulta
+(posições já filtradas e ordenadas) fica num LRU; a página N+1 só fatia o
+array guardado, sem refazer filtro nem ordenação.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+import numpy as np
+from fastapi import HTTPException
+from api.config import settings
+
+SORT_FIELDS = ("price", "rating", "title")
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def validate_sort(sort_by: Optional[str]) -> Optional[str]:
+    if sort_by is None or sort_by.removeprefix("-") in SORT_FIELDS:
+        return sort_by
+    options = ", ".join(f"{f}, -{f}" for f in SORT_FIELDS)
+    raise HTTPException(status_code=400, detail=f"sort_by inválido: {sort_by} (use {options})")
+
+
+def query_hash(query: Hashable) -> str:
+    return hashlib.blake2b(repr(query).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def encode_cursor(version: str, query: Hashable, offset: int) -> str:
+    payload = json.dumps({"v": version, "q": query_hash(query), "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str, query: Hashable) -> int:
+    """Posição inicial guardada no cursor; valida versão do dataset e consulta."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset = int(data["o"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if data.get("q") != query_hash(query) or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor não corresponde a esta consulta")
+    if data.get("v") != version:
+        # as posições mudam a cada versão: a paginação precisa recomeçar
+        raise HTTPException(status_code=409, detail="Cursor expirado: o dataset foi atualizado")
+    return offset
+
+
+def next_cursor(version: str, query: Hashable, end: int, total: int) -> Optional[str]:
+    return encode_cursor(version, query, end) if end < total else None
+
+
+class ResultCache:
+    """LRU de resultados de consultas (posições) para a versão atual do dataset."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._version: Optional[str] = None
+        self._entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str, query: Hashable, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            if version != self._version:
+                # nova versão: resultados antigos não servem mais
+                self._entries.clear()
+                self._version = version
+            result = self._entries.get(query)
+            if result is not None:
+                self._entries.move_to_end(query)
+                return result
+        result = compute()
+        result.setflags(write=False)  # compartilhado entre requisições
+        if self.maxsize > 0:
+            with self._lock:
+                if version == self._version:
+                    self._entries[query] = result
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+# instância compartilhada pelos endpoints de catálogo
+result_cache = ResultCache(settings.SEARCH_CACHE_SIZE)
@@ -0,0 +1,77 @@
+# api/price_model.py
+"""
+Modelo heurístico de preço por categoria usado em /api/v1/ml/predictions.
+As médias por categoria são ajustadas uma vez por versão do dataset
+(artefato versionado), direto dos agregados incrementais (api.aggregates),
+e as predições em lote são vetorizadas com NumPy.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+# ajuste de preço por ponto de rating acima/abaixo de 3
+RATING_FACTOR = 0.03
+
+
+@dataclass(frozen=True)
+class CategoryPriceModel:
+    categories: pd.Index
+    means: np.ndarray
+    default_mean: float
+    version: str  # versão do dataset usada no ajuste
+    fitted_at: float
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, version: str) -> "CategoryPriceModel":
+        # preços nulos recebem a média global antes do agrupamento
+        price = df["price_num"].fillna(df["price_num"].mean())
+        valid = price.notna()
+        price, category = price[valid], df["category"][valid]
+
+        default_mean = float(price.mean())
+        if not np.isfinite(default_mean):
+            default_mean = 0.0
+
+        grouped = price.groupby(category, observed=True).mean()
+        means = grouped.to_numpy(dtype=np.float64)
+        means = np.where(np.isfinite(means), means, default_mean)
+        return cls(
+            categories=pd.Index(grouped.index.astype(object)),
+            means=means,
+            default_mean=default_mean,
+            version=version,
+            fitted_at=time.time(),
+        )
+
+    @classmethod
+    def from_aggregates(cls, aggregates, version: str) -> "CategoryPriceModel":
+        # mesmo resultado de fit, sem percorrer as linhas
+        names, means, default_mean = aggregates.price_means()
+        default_mean = default_mean if default_mean is not None and np.isfinite(default_mean) else 0.0
+        means = np.asarray(means, dtype=np.float64)
+        return cls(
+            categories=pd.Index(names, dtype=object),
+            means=np.where(np.isfinite(means), means, default_mean),
+            default_mean=float(default_mean),
+            version=version,
+            fitted_at=time.time(),
+        )
+
+    def predict(self, categories: Sequence[str], ratings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (preço previsto, base da categoria) para o lote inteiro."""
+        idx = self.categories.get_indexer(categories)
+        base = np.where(idx >= 0, self.means[idx], self.default_mean)
+        predicted = base * (1 + (ratings - 3) * RATING_FACTOR)
+        predicted = np.where(np.isfinite(predicted), predicted, self.default_mean)
+        return predicted, base
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "fitted_at": self.fitted_at,
+            "default_mean": round(self.default_mean, 2),
+            "category_means": {c: round(float(m), 2) for c, m in zip(self.categories, self.means)},
+        }
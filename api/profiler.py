@@ -0,0 +1,57 @@
+# api/profiler.py
+"""
+Profiler por amostragem do processo da API (opt-in, PROFILER_ENABLED).
+Durante N segundos a thread que atende o pedido lê a pilha de todas as
+outras threads a cada intervalo e conta as pilhas iguais. A saída é no
+formato "collapsed stacks" (uma pilha por linha, frames separados por ';' e
+a contagem no fim), aceito por flamegraph.pl, speedscope e inferno.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# um profile por vez por processo
+_running = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))  # raiz primeiro
+
+
+def sample(seconds: float, interval: float = 0.005, ignore: set | None = None) -> Counter:
+    """Amostra as pilhas das threads do processo por `seconds` segundos."""
+    ignore = set(ignore or ()) | {threading.get_ident()}
+    counts: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident not in ignore:
+                counts[_stack(frame)] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def profile(seconds: float, interval: float = 0.005) -> str | None:
+    """Profile em collapsed stacks; None se já houver outro em andamento."""
+    if not _running.acquire(blocking=False):
+        return None
+    try:
+        return collapsed(sample(seconds, interval))
+    finally:
+        _running.release()
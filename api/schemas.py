@@ -1,6 +1,6 @@
 # api/schemas.py
-from pydantic import BaseModel
-from typing import Optional, Dict
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict
 
 # Esquema que representa um livro retornado pela API
 class Book(BaseModel):
@@ -13,6 +13,29 @@ class Book(BaseModel):
     image_url: Optional[str] = None
     book_url: Optional[str] = None
 
+# Consulta de busca dentro de um pedido em lote (mesmos filtros de /books/search)
+class BulkQuery(BaseModel):
+    title: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    sort_by: Optional[str] = None
+    limit: int = Field(100, ge=0, le=1000)
+
+# Pedido em lote: ids e/ou buscas resolvidos numa única chamada
+class BulkRequest(BaseModel):
+    ids: List[int] = Field(default_factory=list, max_length=1000)
+    queries: List[BulkQuery] = Field(default_factory=list, max_length=20)
+
+class BulkQueryResult(BaseModel):
+    total: int
+    books: List[Book]
+
+class BulkResponse(BaseModel):
+    books: List[Book]  # na ordem dos ids pedidos (ids inexistentes ficam de fora)
+    missing: List[int]
+    queries: List[BulkQueryResult]
+
 # Esquema simples para health-check
 class Health(BaseModel):
     status: str
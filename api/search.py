@@ -0,0 +1,181 @@
+# api/search.py
+"""
+Índice de busca em memória para /api/v1/books/search.
+Construído uma única vez por carga do dataset e reutilizado em todas as requisições:
+- índice invertido de trigramas sobre os títulos ASCII (minúsculos)
+- dicionário categoria -> posições das linhas
+- array de preços ordenado para responder min_price/max_price com busca binária
+A semântica é a mesma do caminho pandas (str.contains case-insensitive, ou seja
+re.IGNORECASE). Para ASCII, str.lower dá exatamente o mesmo resultado; títulos
+com outros caracteres ("İstanbul" casa com "ist" no re, mas "İ".lower() tem
+dois caracteres) são comparados com o próprio regex, e consultas não ASCII
+usam o caminho pandas.
+"""
+
+import sys
+import re
+from typing import Optional
+import numpy as np
+import pandas as pd
+from api.compact import owned_bytes, strings_bytes
+
+# caracteres que fazem str.contains interpretar a consulta como regex
+_REGEX_META = set(".^$*+?{}[]\\|()")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _is_literal(query: str) -> bool:
+    return not any(ch in _REGEX_META for ch in query)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _intersect(arrays: list) -> np.ndarray:
+    # interseção de arrays ordenados, começando pelo menor
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for arr in arrays[1:]:
+        if len(result) == 0:
+            break
+        result = np.intersect1d(result, arr, assume_unique=True)
+    return result
+
+
+class SearchIndex:
+    """
+    Índice imutável sobre um DataFrame de livros.
+    `search` devolve as posições (iloc) das linhas que atendem aos filtros,
+    na ordem original do DataFrame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self._title_series = df["title"]
+        self._category_series = df["category"]
+
+        # títulos ASCII em minúsculo + índice de trigramas; os demais (e nulos) ficam None
+        titles = df["title"].tolist()
+        self._titles = [t.lower() if isinstance(t, str) and t.isascii() else None for t in titles]
+        self._unicode_titles = [(pos, t) for pos, t in enumerate(titles) if isinstance(t, str) and not t.isascii()]
+        postings: dict = {}
+        for pos, title in enumerate(self._titles):
+            if title is None:
+                continue
+            for gram in _trigrams(title):
+                lst = postings.get(gram)
+                if lst is None:
+                    postings[gram] = [pos]
+                else:
+                    lst.append(pos)
+        self._postings = {gram: np.asarray(lst, dtype=np.int64) for gram, lst in postings.items()}
+
+        # dicionário de categorias: nome -> posições ordenadas (poucos nomes: casados com o regex)
+        codes, uniques = pd.factorize(df["category"])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self._categories = {
+            name: order[bounds[code]:bounds[code + 1]]
+            for code, name in enumerate(uniques) if isinstance(name, str)
+        }
+
+        # preços válidos ordenados (NaN fica de fora, como na comparação pandas)
+        prices = pd.to_numeric(df["price_num"], errors="coerce").to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(prices))
+        order = np.argsort(prices[valid], kind="stable")
+        self._prices = prices
+        self._price_order = valid[order]
+        self._price_sorted = prices[self._price_order]
+
+    def memory_bytes(self) -> int:
+        """Memória própria do índice: títulos minúsculos, trigramas, categorias e preços ordenados."""
+        postings = sys.getsizeof(self._postings) + sum(
+            sys.getsizeof(gram) + sys.getsizeof(arr) for gram, arr in self._postings.items()
+        )
+        arrays = [self._prices, self._price_order, self._price_sorted, *self._categories.values()]
+        return strings_bytes(self._titles) + postings + sum(owned_bytes(a) for a in arrays)
+
+    # --- filtros individuais ---
+    def _match_title(self, query: str) -> np.ndarray:
+        if not _is_literal(query) or not query.isascii():
+            mask = self._title_series.str.contains(query, case=False, na=False)
+            return np.flatnonzero(mask.to_numpy())
+        indexed = self._match_ascii_titles(query.lower())
+        if not self._unicode_titles:
+            return indexed
+        pattern = re.compile(query, re.IGNORECASE)
+        others = [pos for pos, title in self._unicode_titles if pattern.search(title)]
+        if not others:
+            return indexed
+        return np.union1d(indexed, np.asarray(others, dtype=np.int64))
+
+    def _match_ascii_titles(self, q: str) -> np.ndarray:
+        if len(q) < 3:
+            candidates = range(self.size)
+        else:
+            lists = []
+            for gram in _trigrams(q):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return _EMPTY
+                lists.append(posting)
+            candidates = _intersect(lists)
+            if len(q) == 3:
+                # a lista de um único trigrama já é o resultado exato
+                return candidates
+            candidates = candidates.tolist()
+        titles = self._titles
+        hits = [pos for pos in candidates if titles[pos] is not None and q in titles[pos]]
+        return np.asarray(hits, dtype=np.int64)
+
+    def _match_category(self, query: str) -> np.ndarray:
+        if not _is_literal(query):
+            mask = self._category_series.str.contains(query, case=False, na=False)
+            return np.flatnonzero(mask.to_numpy())
+        pattern = re.compile(query, re.IGNORECASE)
+        matches = [rows for name, rows in self._categories.items() if pattern.search(name)]
+        if not matches:
+            return _EMPTY
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+        prices = self._price_sorted
+        lo = 0 if min_price is None else np.searchsorted(prices, min_price, side="left")
+        hi = len(prices) if max_price is None else np.searchsorted(prices, max_price, side="right")
+        if hi <= lo:
+            return _EMPTY
+        return np.sort(self._price_order[lo:hi])
+
+    def search(
+        self,
+        title: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> np.ndarray:
+        sets = []
+        if title:
+            sets.append(self._match_title(title))
+        if category:
+            sets.append(self._match_category(category))
+
+        has_price = min_price is not None or max_price is not None
+        if not sets:
+            if has_price:
+                return self._price_range(min_price, max_price)
+            return np.arange(self.size, dtype=np.int64)
+
+        result = _intersect(sets)
+        if has_price and len(result):
+            # com poucos candidatos é mais barato filtrar direto pelo preço
+            prices = self._prices[result]
+            mask = np.ones(len(result), dtype=bool)
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+            result = result[mask]
+        return result
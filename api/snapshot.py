@@ -0,0 +1,177 @@
+# api/snapshot.py
+"""
+Snapshot colunar binário do dataset (layout NumPy mapeável em memória).
+Gravado pelo scraper ao lado do CSV (data/books.csv -> data/books.snapshot/):
+- colunas numéricas (id, rating, price_num, stock) em .npy, abertas com mmap,
+  de modo que vários workers do uvicorn compartilham as mesmas páginas
+- colunas de texto como um único arquivo UTF-8 + offsets (em caracteres)
+- colunas categóricas (categoria e moldes de api.compact) como códigos
+  inteiros + lista de categorias no manifest
+- estatísticas agregadas (api.aggregates) em aggregates.json, quando fornecidas
+O manifest guarda a impressão digital do CSV de origem: se o CSV mudar
+depois do snapshot, load_data volta a ler o CSV.
+
+Uso: python -m api.snapshot   (gera o snapshot a partir de DATA_PATH)
+"""
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 2
+MANIFEST = "manifest.json"
+AGGREGATES = "aggregates.json"
+# colunas de texto com poucos valores distintos, gravadas como códigos
+# (além das que já são categóricas)
+CATEGORY_COLUMNS = ("category",)
+
+
+def snapshot_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def file_fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def read_manifest(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == SNAPSHOT_FORMAT else None
+
+
+def snapshot_is_current(path: str, csv_path: str) -> bool:
+    """Snapshot válido e gerado a partir da versão atual do CSV (ou CSV ausente)."""
+    manifest = read_manifest(path)
+    if manifest is None:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return manifest.get("source") == file_fingerprint(csv_path)
+
+
+def _write_strings(directory: str, name: str, values: pd.Series) -> dict:
+    nulls = values.isna().to_numpy()
+    texts = ["" if null else str(v) for v, null in zip(values.tolist(), nulls)]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8", newline="") as f:
+        f.write("".join(texts))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    spec = {"kind": "string"}
+    if nulls.any():
+        np.save(os.path.join(directory, f"{name}.nulls.npy"), nulls)
+        spec["nulls"] = True
+    return spec
+
+
+def _read_strings(directory: str, name: str, spec: dict) -> np.ndarray:
+    with open(os.path.join(directory, f"{name}.txt"), encoding="utf-8", newline="") as f:
+        text = f.read()
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy")).tolist()
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [text[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+    if spec.get("nulls"):
+        values[np.load(os.path.join(directory, f"{name}.nulls.npy"))] = None
+    return values
+
+
+def read_aggregates(path: str) -> dict | None:
+    """Agregados gravados junto do snapshot (None se o snapshot não os tiver)."""
+    manifest = read_manifest(path)
+    if manifest is None or not manifest.get("aggregates"):
+        return None
+    try:
+        with open(os.path.join(path, AGGREGATES), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # mesma versão do manifest: os dois arquivos saem do mesmo write_snapshot
+    return data if data.get("version") == manifest["version"] else None
+
+
+def write_snapshot(df: pd.DataFrame, path: str, source: str | None = None, aggregates: dict | None = None) -> dict:
+    """
+    Grava `df` (já normalizado por prepare_books) em `path`.
+    A troca do diretório é feita por rename, então leitores nunca veem um snapshot pela metade.
+    """
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        if name in CATEGORY_COLUMNS or isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype("category")
+            np.save(os.path.join(tmp, f"{name}.codes.npy"), col.cat.codes.to_numpy(dtype=np.int32))
+            columns[name] = {"kind": "category", "categories": col.cat.categories.tolist()}
+        elif pd.api.types.is_numeric_dtype(col.dtype):
+            np.save(os.path.join(tmp, f"{name}.npy"), col.to_numpy())
+            columns[name] = {"kind": "numeric", "dtype": str(col.dtype)}
+        else:
+            columns[name] = _write_strings(tmp, name, col)
+
+    fingerprint = file_fingerprint(source) if source and os.path.exists(source) else None
+    if fingerprint:
+        # mesma versão que data_version daria para o CSV de origem
+        version = f"{fingerprint['mtime_ns']:x}-{fingerprint['size']:x}"
+    else:
+        version = f"{time.time_ns():x}-{len(df):x}"
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": len(df),
+        "columns": columns,
+        "source": fingerprint,
+        "version": version,
+        "aggregates": aggregates is not None,
+    }
+    if aggregates is not None:
+        with open(os.path.join(tmp, AGGREGATES), "w", encoding="utf-8") as f:
+            json.dump({**aggregates, "version": version}, f, ensure_ascii=False)
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    # arquivos ainda mapeados por outros processos continuam válidos após a remoção
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def read_snapshot(path: str, mmap: bool = True) -> pd.DataFrame:
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"Snapshot inválido ou ausente: {path}")
+    data = {}
+    for name, spec in manifest["columns"].items():
+        if spec["kind"] == "numeric":
+            values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            # view como ndarray comum: continua no mmap, mas sem os resultados np.memmap nas operações
+            data[name] = values.view(np.ndarray)
+        elif spec["kind"] == "category":
+            codes = np.load(os.path.join(path, f"{name}.codes.npy"))
+            # código -1 = nulo
+            data[name] = pd.Categorical.from_codes(codes, categories=spec["categories"])
+        else:
+            data[name] = _read_strings(path, name, spec)
+    # copy=False mantém as colunas numéricas apontando para o mmap
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    from api.config import settings
+    from api.utils import load_data
+
+    frame = load_data(settings.DATA_PATH, prefer_snapshot=False)
+    info = write_snapshot(frame, snapshot_path(settings.DATA_PATH), source=settings.DATA_PATH)
+    print(f"Snapshot gravado em {snapshot_path(settings.DATA_PATH)}: {info['rows']} registros")
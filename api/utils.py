@@ -3,21 +3,51 @@
 Funções utilitárias para carregar e consultar o dataset em memória.
 """
 
+import os
 import pandas as pd
 from api.config import settings
+from api.snapshot import snapshot_path, snapshot_is_current, read_manifest, read_snapshot
+from api.compact import compact_books
 
-# carrega o CSV em um DataFrame global (pode ser substituído por DB no futuro)
-def load_data(path: str | None = None) -> pd.DataFrame:
+# preço inteiro: símbolo de moeda opcional (inclusive o "Â£", mojibake de "£" no CSV) + número;
+# qualquer outra coisa vira NaN em vez de um pedaço do número
+PRICE_PATTERN = r"^\s*[^\d\s.,+-]*\s*(-?\d+(?:\.\d+)?)\s*$"
+# separador de milhar ("£1,234.56"), removido antes do PRICE_PATTERN
+THOUSANDS_PATTERN = r"(?<=\d),(?=\d{3}(?!\d))"
+# "In stock (22 available)" -> 22
+STOCK_PATTERN = r"\((\d+) available\)"
+
+# identifica a versão do arquivo de dados (muda a cada nova escrita do scraper)
+def data_version(path: str | None = None) -> str:
+    path = path or settings.DATA_PATH
+    if not os.path.exists(path):
+        # só o snapshot foi publicado: a versão vem do manifest
+        manifest = read_manifest(snapshot_path(path))
+        if manifest is not None:
+            return manifest["version"]
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+# carrega o snapshot colunar (mmap) se estiver em dia com o CSV; senão lê o CSV
+# (nos dois casos a tabela já vem na forma compacta de api.compact)
+def load_data(path: str | None = None, prefer_snapshot: bool = True) -> pd.DataFrame:
     path = path or settings.DATA_PATH
+    snapshot = snapshot_path(path)
+    if prefer_snapshot and snapshot_is_current(snapshot, path):
+        return read_snapshot(snapshot)
     df = pd.read_csv(path)
+    return compact_books(prepare_books(df))
+
+# normaliza um DataFrame no schema de data/books.csv (usado também pelos benchmarks)
+def prepare_books(df: pd.DataFrame) -> pd.DataFrame:
     # assegura coluna id
     if "id" not in df.columns:
         df.insert(0, "id", range(1, len(df) + 1))
-    # cria coluna numérica de preço, se possível
-    def price_to_float(x):
-        try:
-            return float(str(x).replace("£", "").strip())
-        except:
-            return None
-    df["price_num"] = df["price"].apply(price_to_float)
-    return df
\ No newline at end of file
+    # cria coluna numérica de preço, se possível (vetorizado; inválidos viram NaN)
+    price = df["price"].astype(str).str.replace(THOUSANDS_PATTERN, "", regex=True)
+    price = price.str.extract(PRICE_PATTERN, expand=False)
+    df["price_num"] = pd.to_numeric(price, errors="coerce")
+    # quantidade em estoque (0 quando indisponível ou sem contagem)
+    stock = df["availability"].astype(str).str.extract(STOCK_PATTERN, expand=False)
+    df["stock"] = pd.to_numeric(stock, errors="coerce").fillna(0).astype("int64")
+    return df
@@ -0,0 +1,327 @@
+# benchmarks/bench_api.py
+"""
+Suíte de latência/throughput da API sobre catálogos sintéticos.
+Gera um catálogo de N livros (schema de data/books.csv, com snapshot), chama
+todos os endpoints (menos os de EXCLUDED, com o motivo) e mede p50/p95/p99,
+requisições/s e RSS, em processo (TestClient) e/ou contra um uvicorn local. O resultado vai para um JSON que
+pode ser comparado com benchmarks/compare.py.
+
+Uso:
+  python -m benchmarks.bench_api --sizes 1000 100000 --modes inprocess uvicorn \\
+      --requests 200 --concurrency 8 --output bench-results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import httpx
+import numpy as np
+from benchmarks.synthetic import make_books
+
+SORTED_SEARCH = "/api/v1/books/search?min_price=0&sort_by=-price&limit=20"
+
+# (nome, método, caminho, corpo JSON, protegido); {campos} vêm de _values/fixed no início de cada run
+ENDPOINTS = [
+    ("root", "GET", "/", None, False),
+    ("health", "GET", "/api/v1/health", None, False),
+    ("books", "GET", "/api/v1/books?limit=100", None, False),
+    ("book_by_id", "GET", "/api/v1/books/{book_id}", None, False),
+    ("books_bulk", "POST", "/api/v1/books/bulk", {"ids": list(range(1, 201, 2))}, False),
+    ("books_bulk_queries", "POST", "/api/v1/books/bulk", {"ids": list(range(1, 21)), "queries": [
+        {"title": "garden", "limit": 20},
+        {"category": "poetry", "min_price": 20, "sort_by": "-price", "limit": 20},
+    ]}, False),
+    ("search_title", "GET", "/api/v1/books/search?title=garden&limit=100", None, False),
+    ("search_filters", "GET", "/api/v1/books/search?category=poetry&min_price=20&max_price=40", None, False),
+    ("search_sorted", "GET", SORTED_SEARCH, None, False),
+    ("search_cursor", "GET", SORTED_SEARCH + "&cursor={cursor}", None, False),
+    ("categories", "GET", "/api/v1/categories", None, False),
+    ("stats_overview", "GET", "/api/v1/stats/overview", None, False),
+    ("stats_categories", "GET", "/api/v1/stats/categories", None, False),
+    ("stats_ratings", "GET", "/api/v1/stats/ratings", None, False),
+    ("stats_stock", "GET", "/api/v1/stats/stock", None, False),
+    ("top_rated", "GET", "/api/v1/books/top-rated?limit=50", None, False),
+    ("ml_features", "GET", "/api/v1/ml/features", None, False),
+    ("ml_training_data", "GET", "/api/v1/ml/training-data", None, False),
+    ("ml_training_stream", "GET", "/api/v1/ml/training-data/stream?limit=1000", None, False),
+    ("ml_features_stream", "GET", "/api/v1/ml/features/stream?limit=1000", None, False),
+    ("ml_model", "GET", "/api/v1/ml/model", None, False),
+    ("ml_predictions", "POST", "/api/v1/ml/predictions",
+     [{"category": "Poetry", "rating": 4}, {"category": "Travel", "rating": 2}], False),
+    ("auth_login", "POST", "/api/v1/auth/login", {"username": "{admin_user}", "password": "{admin_password}"}, False),
+    ("auth_refresh", "POST", "/api/v1/auth/refresh", {"refresh_token": "{refresh_token}"}, False),
+    ("admin_dataset", "GET", "/api/v1/admin/dataset", None, True),
+    ("admin_dataset_reload", "POST", "/api/v1/admin/dataset/reload", None, True),
+    ("admin_auth_cache", "GET", "/api/v1/admin/auth-cache", None, True),
+    ("scraping_jobs", "GET", "/api/v1/scraping/jobs", None, True),
+    ("scraping_job", "GET", "/api/v1/scraping/jobs/{job_id}", None, True),
+    ("metrics", "GET", "/metrics", None, False),
+]
+# endpoints fora da suíte e por quê
+EXCLUDED = {
+    "POST /api/v1/auth/logout": "revogaria o token usado pelas chamadas protegidas da suíte",
+    "POST /api/v1/scraping/trigger": "dispara um crawl de verdade, em outro processo e com acesso à rede",
+    "POST /api/v1/admin/profile": "só com PROFILER_ENABLED e bloqueia pelos `seconds` pedidos",
+}
+# respostas de catálogo inteiro: menos repetições nos catálogos grandes
+FULL_DUMPS = {"ml_features", "ml_training_data"}
+WARMUP = 3
+
+
+def rss_mb(pid: int | None = None) -> float | None:
+    """RSS atual do processo (Linux, via /proc)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def write_catalog(root: str, n_books: int) -> str:
+    from api.compact import compact_books
+    from api.snapshot import snapshot_path, write_snapshot
+    from api.utils import prepare_books
+
+    path = os.path.join(root, "books.csv")
+    df = make_books(n_books)
+    df.to_csv(path, index=False)
+    write_snapshot(compact_books(prepare_books(df)), snapshot_path(path), source=path)
+    return path
+
+
+def write_job(jobs_dir: str) -> str:
+    """Job de scraping já concluído, para /scraping/jobs e /scraping/jobs/{id}."""
+    os.makedirs(jobs_dir, exist_ok=True)
+    now = time.time()
+    job = {"id": "bench", "trigger": "bench", "status": "succeeded", "pid": None, "created_at": now - 60,
+           "finished_at": now, "progress": {"pages": 1050, "books": 1000, "errors": 0}, "result": {"books": 1000},
+           "error": None}
+    with open(os.path.join(jobs_dir, "bench.json"), "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    return job["id"]
+
+
+def _values(request, n_books: int) -> dict:
+    """Valores que dependem do catálogo carregado: id de um livro do meio e um cursor válido."""
+    first = request("GET", f"/api/v1/books?limit=1&skip={n_books // 2}").json()
+    cursor = request("GET", SORTED_SEARCH).headers.get("x-next-cursor")
+    if not cursor:
+        raise RuntimeError(f"{SORTED_SEARCH} não devolveu X-Next-Cursor: catálogo pequeno demais para a suíte")
+    return {"book_id": first[0]["id"] if first else 1, "cursor": cursor}
+
+
+def _fill(value, values: dict):
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, dict):
+        return {k: _fill(v, values) for k, v in value.items()}
+    return value
+
+
+def summarize(name: str, latencies: list, wall: float, errors: int) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "rps": round(len(latencies) / wall, 1) if wall else None,
+    }
+
+
+def _requests_for(name: str, n_books: int, requests: int) -> int:
+    if name in FULL_DUMPS and n_books > 10_000:
+        return max(5, requests // 20)
+    return requests
+
+
+def run_inprocess(path: str, n_books: int, requests: int, token: str, fixed: dict) -> dict:
+    from fastapi.testclient import TestClient
+    from api.config import settings
+    from api.dataset import dataset_provider
+    from api.main import app
+
+    settings.SCRAPER_JOBS_DIR = fixed["jobs_dir"]
+    started = time.perf_counter()
+    dataset_provider.load(path)
+    startup = time.perf_counter() - started
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    values = {**fixed, **_values(client.request, n_books)}
+    results = []
+    for name, method, url, body, protected in ENDPOINTS:
+        url = url.format(**values)
+        kwargs = {"json": _fill(body, values), "headers": headers if protected else None}
+        for _ in range(WARMUP):
+            client.request(method, url, **kwargs)
+        latencies, errors = [], 0
+        wall = time.perf_counter()
+        for _ in range(_requests_for(name, n_books, requests)):
+            start = time.perf_counter()
+            resp = client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            errors += resp.status_code >= 400
+        results.append(summarize(name, latencies, time.perf_counter() - wall, errors))
+    rss = rss_mb()
+    return {"startup_seconds": round(startup, 3), "rss_mb": round(rss, 1) if rss else None, "endpoints": results}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _drive(base_url: str, requests: int, concurrency: int, token: str, values: dict) -> list:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+    n_books = values["n_books"]
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+        results = []
+        for name, method, url, body, protected in ENDPOINTS:
+            url = url.format(**values)
+            kwargs = {"json": _fill(body, values), "headers": headers if protected else None}
+            for _ in range(WARMUP):
+                await client.request(method, url, **kwargs)
+            total = _requests_for(name, n_books, requests)
+            latencies, errors = [], 0
+            slots = asyncio.Semaphore(concurrency)
+
+            async def one():
+                nonlocal errors
+                async with slots:
+                    start = time.perf_counter()
+                    resp = await client.request(method, url, **kwargs)
+                    latencies.append(time.perf_counter() - start)
+                    errors += resp.status_code >= 400
+
+            wall = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            results.append(summarize(name, latencies, time.perf_counter() - wall, errors))
+        return results
+
+
+def run_uvicorn(path: str, n_books: int, requests: int, concurrency: int, workers: int, token: str,
+                fixed: dict) -> dict:
+    port = _free_port()
+    env = dict(os.environ, DATA_PATH=path, DATA_RELOAD_INTERVAL="0", SCRAPER_SCHEDULE_MINUTES="0", LOG_LEVEL="WARNING",
+               SCRAPER_JOBS_DIR=fixed["jobs_dir"])
+    cmd = [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    server = subprocess.Popen(cmd, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.perf_counter()
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou com código {server.returncode}")
+            try:
+                if httpx.get(base_url + "/api/v1/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() - started > 600:
+                raise TimeoutError("uvicorn não respondeu em 600s")
+            time.sleep(0.2)
+        startup = time.perf_counter() - started
+        with httpx.Client(base_url=base_url, timeout=300) as client:
+            values = {**fixed, **_values(client.request, n_books), "n_books": n_books}
+        results = asyncio.run(_drive(base_url, requests, concurrency, token, values))
+        # com --workers > 1 o RSS relevante é a soma do master e dos filhos
+        return {"startup_seconds": round(startup, 3), "rss_mb": _tree_rss_mb(server.pid), "endpoints": results}
+    finally:
+        server.terminate()
+        server.wait(30)
+
+
+def _tree_rss_mb(pid: int) -> float | None:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    values = [v for v in (rss_mb(p) for p in pids) if v is not None]
+    return round(sum(values), 1) if values else None
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "uvicorn"], default=["inprocess", "uvicorn"])
+    parser.add_argument("--requests", type=int, default=200, help="requisições medidas por endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="requisições simultâneas (modo uvicorn)")
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    parser.add_argument("--output", default="bench-results.json")
+    args = parser.parse_args(argv)
+
+    from api.auth import create_token
+    from api.config import settings
+    token = create_token({"sub": "bench", "scope": "admin"})
+    for endpoint, reason in EXCLUDED.items():
+        print(f"fora da suíte: {endpoint} ({reason})")
+
+    runs = []
+    for n_books in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_catalog(tmp, n_books)
+            jobs_dir = os.path.join(tmp, "jobs")
+            fixed = {
+                "jobs_dir": jobs_dir,
+                "job_id": write_job(jobs_dir),
+                "refresh_token": create_token({"sub": "bench", "scope": "admin"}),
+                "admin_user": settings.ADMIN_USER,
+                "admin_password": settings.ADMIN_PASSWORD,
+            }
+            for mode in args.modes:
+                print(f"\n== {n_books:,} livros, {mode} ==", flush=True)
+                if mode == "inprocess":
+                    run = run_inprocess(path, n_books, args.requests, token, fixed)
+                else:
+                    run = run_uvicorn(path, n_books, args.requests, args.concurrency, args.workers, token, fixed)
+                run.update(size=n_books, mode=mode)
+                runs.append(run)
+                print(f"startup {run['startup_seconds']}s, RSS {run['rss_mb']} MB")
+                print(f"{'endpoint':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'erros':>7}")
+                for r in run["endpoints"]:
+                    print(f"{r['endpoint']:<20}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                          f"{r['rps']:>9.1f}{r['errors']:>7}")
+
+    meta = {
+        "excluded": EXCLUDED,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "runs": runs}, f, indent=2)
+    print(f"\nResultados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
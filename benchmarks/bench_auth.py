@@ -0,0 +1,48 @@
+# benchmarks/bench_auth.py
+"""
+Throughput de um endpoint protegido com e sem o cache de tokens validados.
+Uso: python -m benchmarks.bench_auth [requisições]   (padrão: 2000)
+"""
+
+import sys
+import time
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from api import auth
+from api.main import app
+
+ENDPOINT = "/api/v1/admin/auth-cache"
+
+
+def _dependency(token: str, n: int) -> float:
+    # só a dependência: isola o custo do jwt.decode do resto da pilha HTTP
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    start = time.perf_counter()
+    for _ in range(n):
+        auth.get_current_user(credentials)
+    return n / (time.perf_counter() - start)
+
+
+def _http(client: TestClient, headers: dict, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(ENDPOINT, headers=headers)
+    return n / (time.perf_counter() - start)
+
+
+def run(n: int):
+    token = auth.create_token({"sub": "admin", "scope": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+    print(f"{'modo':<12}{'dependência (req/s)':>22}{'HTTP (req/s)':>16}")
+    for label, maxsize in (("sem cache", 0), ("com cache", 1024)):
+        auth.token_cache.maxsize = maxsize
+        auth.token_cache.clear()
+        dep = _dependency(token, n * 10)
+        http = _http(client, headers, n)
+        print(f"{label:<12}{dep:>22,.0f}{http:>16,.0f}")
+    print(f"\ncache: {auth.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,53 @@
+# benchmarks/bench_json.py
+"""
+Tempo de resposta de /api/v1/books com o caminho padrão (dicts + response_model
++ json) e com FAST_JSON (dicts -> orjson, sem response_model), para limit=100/1000/10000.
+Uso: python -m benchmarks.bench_json [livros no catálogo]   (padrão: 20000)
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+from api import catalog
+from api.config import settings
+from api.dataset import dataset_provider
+from api.main import app
+from benchmarks.synthetic import make_books
+
+LIMITS = (100, 1000, 10000)
+
+
+def _median_ms(client: TestClient, url: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(url)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+def run(n_books: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "books.csv")
+        make_books(n_books).to_csv(path, index=False)
+        dataset_provider.load(path)
+    client = TestClient(app)
+    encoder = "orjson" if catalog.orjson is not None else "json (orjson não instalado)"
+    print(f"catálogo: {n_books:,} livros; caminho rápido com {encoder}")
+    print(f"{'limit':>7}{'padrão (ms)':>14}{'FAST_JSON (ms)':>17}{'ganho':>9}")
+    for limit in LIMITS:
+        url = f"/api/v1/books?limit={limit}"
+        repeat = 50 if limit <= 1000 else 10
+        settings.FAST_JSON = False
+        slow = _median_ms(client, url, repeat)
+        settings.FAST_JSON = True
+        fast = _median_ms(client, url, repeat)
+        print(f"{limit:>7}{slow:>14.2f}{fast:>17.2f}{slow / fast:>8.1f}x")
+    settings.FAST_JSON = False
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,31 @@
+# benchmarks/bench_parse.py
+"""
+Micro-benchmark dos backends de parse sobre as páginas salvas em tests/fixtures.
+Uso: python -m benchmarks.bench_parse [repetições]   (padrão: 300)
+"""
+
+import sys
+import time
+from pathlib import Path
+from scripts.parsers import available_backends, get_parser
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+
+def run(repeat: int):
+    book = (FIXTURES / "book.html").read_bytes()
+    listing = (FIXTURES / "listing.html").read_bytes()
+    print(f"{'backend':<12} {'detalhe µs/pág':>15} {'listagem µs/pág':>16}")
+    for name in available_backends():
+        parser = get_parser(name)
+        timings = []
+        for fn, content in ((parser.parse_book, book), (parser.parse_listing, listing)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn(content, "https://books.toscrape.com/catalogue/page-2.html")
+            timings.append((time.perf_counter() - start) / repeat * 1e6)
+        print(f"{name:<12} {timings[0]:>15.0f} {timings[1]:>16.0f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
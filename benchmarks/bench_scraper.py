@@ -0,0 +1,44 @@
+# benchmarks/bench_scraper.py
+"""
+Mede o throughput (páginas/s) do crawler contra um site sintético local
+com latência artificial por resposta, variando a concorrência de downloads
+e o número de processos de parse.
+Uso: python -m benchmarks.bench_scraper [n_livros] [latência_s] [parser]   (padrão: 400 0.05 auto)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import serve_site, write_site
+from scripts.scrape_books import scrape_all_books
+
+# (downloads simultâneos, processos de parse)
+SCENARIOS = [(1, 0), (4, 0), (16, 0), (32, 0), (16, os.cpu_count() or 2), (32, os.cpu_count() or 2)]
+
+
+def run(n_books: int, latency: float, parser: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        n_pages = write_site(tmp, n_books)
+        output = os.path.join(tmp, "out", "books.csv")
+        print(f"{n_pages} páginas, latência {latency * 1e3:.0f} ms/resposta, parser {parser}")
+        print(f"{'concorrência':>12} {'proc. parse':>11} {'tempo s':>10} {'páginas/s':>10}")
+        with serve_site(tmp, latency=latency) as base_url:
+            for level, workers in SCENARIOS:
+                start = time.perf_counter()
+                books = scrape_all_books(
+                    output, base_url=base_url, max_concurrency=level, rate_limit=0, cache_dir="",
+                    parser=parser, parse_workers=workers,
+                )
+                elapsed = time.perf_counter() - start
+                assert len(books) == n_books
+                print(f"{level:>12} {workers:>11} {elapsed:>10.2f} {n_pages / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(
+        int(args[0]) if args else 400,
+        float(args[1]) if len(args) > 1 else 0.05,
+        args[2] if len(args) > 2 else "auto",
+    )
@@ -0,0 +1,70 @@
+# benchmarks/bench_search.py
+"""
+Compara o caminho pandas original de /api/v1/books/search com o SearchIndex.
+Uso: python -m benchmarks.bench_search [tamanhos...]   (padrão: 1000 100000 1000000)
+"""
+
+import sys
+import time
+import numpy as np
+from api.utils import prepare_books
+from api.search import SearchIndex
+from benchmarks.synthetic import make_books
+
+QUERIES = [
+    {"title": "garden"},
+    {"title": "the"},
+    {"title": "of night 7"},
+    {"title": "zzz"},
+    {"category": "fiction"},
+    {"min_price": 20.0, "max_price": 25.0},
+    {"title": "stone", "category": "poetry", "min_price": 30.0},
+]
+
+
+def pandas_search(df, title=None, category=None, min_price=None, max_price=None, limit=100):
+    # cópia fiel da implementação anterior do endpoint
+    df = df.copy()
+    if title:
+        df = df[df["title"].str.contains(title, case=False, na=False)]
+    if category:
+        df = df[df["category"].str.contains(category, case=False, na=False)]
+    if min_price is not None:
+        df = df[df["price_num"] >= min_price]
+    if max_price is not None:
+        df = df[df["price_num"] <= max_price]
+    return df.head(limit).to_dict(orient="records")
+
+
+def index_search(df, index, limit=100, **query):
+    positions = index.search(**query)
+    return df.iloc[positions[:limit]].to_dict(orient="records")
+
+
+def _timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def run(sizes):
+    for n in sizes:
+        df = prepare_books(make_books(n))
+        start = time.perf_counter()
+        index = SearchIndex(df)
+        build = time.perf_counter() - start
+        repeat = 20 if n <= 100_000 else 3
+        print(f"\n== {n:,} livros (build do índice: {build:.2f}s) ==")
+        print(f"{'consulta':<60} {'pandas ms':>10} {'índice ms':>10} {'speedup':>8}")
+        for query in QUERIES:
+            assert pandas_search(df, **query) == index_search(df, index, **query), query
+            t_pandas = _timeit(lambda: pandas_search(df, **query), repeat)
+            t_index = _timeit(lambda: index_search(df, index, **query), repeat)
+            print(f"{str(query):<60} {t_pandas * 1e3:>10.2f} {t_index * 1e3:>10.2f} {t_pandas / t_index:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [1_000, 100_000, 1_000_000])
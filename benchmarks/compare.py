@@ -0,0 +1,56 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de benchmarks/bench_api.py (base x atual).
+Mostra a variação de p50/p95 por endpoint e termina com código 1 se algum
+endpoint piorou mais que o limite (útil em CI).
+Uso: python -m benchmarks.compare base.json atual.json [--threshold 0.10] [--metric p95_ms]
+"""
+
+import argparse
+import json
+import sys
+
+
+def _index(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        (run["mode"], run["size"], r["endpoint"]): r
+        for run in data["runs"]
+        for r in run["endpoints"]
+    }
+
+
+def compare(base: dict, current: dict, metric: str, threshold: float) -> list:
+    """Linhas (chave, base, atual, variação) e a lista de regressões."""
+    rows, regressions = [], []
+    for key in sorted(base.keys() & current.keys()):
+        before, after = base[key][metric], current[key][metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((key, before, after, change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=0.10, help="piora relativa tolerada (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(_index(args.base), _index(args.current), args.metric, args.threshold)
+    print(f"{'modo':<10}{'livros':>9}  {'endpoint':<20}{'base':>10}{'atual':>10}{'variação':>10}")
+    for (mode, size, endpoint), before, after, change in rows:
+        flag = "  <-- regressão" if (mode, size, endpoint) in regressions else ""
+        print(f"{mode:<10}{size:>9}  {endpoint:<20}{before:>10.2f}{after:>10.2f}{change:>+10.1%}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) acima de {args.threshold:.0%} em {args.metric}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
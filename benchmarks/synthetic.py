@@ -0,0 +1,243 @@
+# benchmarks/synthetic.py
+"""
+Gera catálogos sintéticos no mesmo schema de data/books.csv
+para medir a API com 1k, 100k ou 1M livros, e um site estático no formato
+de books.toscrape.com (com servidor HTTP local) para testar o scraper.
+"""
+
+import contextlib
+import http.server
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+BASE_URL = "https://books.toscrape.com/"
+
+_WORDS = (
+    "light attic velvet soumission sharp objects sapiens requiem dark secret history "
+    "shadow garden river mountain night ocean silent golden broken city house winter "
+    "summer fire stone glass heart song journey kingdom empire letters memory dream "
+    "island forest storm wild lost hidden last first little great young old blue red "
+    "black white love war time world life death star moon sun road door"
+).split()
+
+_CATEGORIES = (
+    "Poetry", "Historical Fiction", "Fiction", "Mystery", "History", "Young Adult",
+    "Business", "Default", "Romance", "Nonfiction", "Science Fiction", "Travel",
+    "Music", "Science", "Philosophy", "Fantasy", "Horror", "Humor", "Classics", "Sports",
+)
+
+_RATING_WORDS = 5
+
+
+def make_books(n: int, seed: int = 42) -> pd.DataFrame:
+    """Retorna um DataFrame com `n` livros (colunas idênticas às do CSV do scraper)."""
+    rng = np.random.default_rng(seed)
+    words = np.array(_WORDS, dtype=object)
+    w1 = words[rng.integers(0, len(words), n)]
+    w2 = words[rng.integers(0, len(words), n)]
+    w3 = words[rng.integers(0, len(words), n)]
+    ids = np.arange(1, n + 1)
+    titles = [f"The {a.title()} {b} of {c} {i}" for a, b, c, i in zip(w1, w2, w3, ids)]
+    prices = rng.integers(1000, 6000, n) / 100
+    stock = rng.integers(0, 23, n)
+    slugs = [t.lower().replace(" ", "-") for t in titles]
+    return pd.DataFrame({
+        "id": ids,
+        "title": titles,
+        "price": [f"£{p:.2f}" for p in prices],
+        "rating": rng.integers(1, _RATING_WORDS + 1, n),
+        "availability": [f"In stock ({s} available)" for s in stock],
+        "category": np.array(_CATEGORIES, dtype=object)[rng.integers(0, len(_CATEGORIES), n)],
+        "image_url": [f"{BASE_URL}media/cache/{i % 256:02x}/{i:08x}.jpg" for i in ids],
+        "book_url": [f"{BASE_URL}catalogue/{s}_{i}/index.html" for s, i in zip(slugs, ids)],
+    })
+
+
+# --- Site sintético no formato de books.toscrape.com (scraper) ---
+
+_RATING_NAMES = ("One", "Two", "Three", "Four", "Five")
+
+_HEAD = """<!DOCTYPE html>
+<!--[if lt IE 7]>      <html lang="en-us" class="no-js lt-ie9 lt-ie8 lt-ie7"> <![endif]-->
+<html lang="en-us" class="no-js">
+<head>
+<title>{title} | Books to Scrape - Sandbox</title>
+<meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+<meta name="created" content="24th Jun 2016 09:29" />
+<meta name="description" content="{title}" />
+<meta name="viewport" content="width=device-width" />
+<meta name="robots" content="NOARCHIVE,NOCACHE" />
+<link rel="shortcut icon" href="{root}static/oscar/favicon.ico" />
+<link rel="stylesheet" type="text/css" href="{root}static/oscar/css/styles.css" />
+<link rel="stylesheet" href="{root}static/oscar/js/bootstrap-datetimepicker/bootstrap-datetimepicker.css" />
+</head>
+<body id="default" class="default">
+<header class="header container-fluid">
+<div class="page_inner"><div class="row">
+<div class="col-sm-8 h1"><a href="{root}index.html">Books to Scrape</a><small> We love being scraped!</small></div>
+</div></div>
+</header>
+<div class="container-fluid page"><div class="page_inner">
+"""
+
+_FOOT = """
+</div></div>
+<footer class="footer container-fluid"></footer>
+<script src="{root}static/oscar/js/jquery/jquery-1.9.1.min.js" type="text/javascript"></script>
+<script src="{root}static/oscar/js/bootstrap3/bootstrap.min.js" type="text/javascript"></script>
+<script type="text/javascript">$(function() {{ oscar.init(); }});</script>
+</body>
+</html>
+"""
+
+_BOOK_BODY = """<ul class="breadcrumb">
+<li><a href="../../index.html">Home</a></li>
+<li><a href="../category/books_1/index.html">Books</a></li>
+<li><a href="../category/books/{category_slug}_{category_id}/index.html">{category}</a></li>
+<li class="active">{title}</li>
+</ul>
+<div id="messages"></div>
+<div class="content"><div id="promotions"></div><div id="content_inner">
+<article class="product_page"><!-- Start of product page -->
+<div class="row">
+<div class="col-sm-6">
+<div id="product_gallery" class="carousel"><div class="thumbnail"><div class="carousel-inner">
+<div class="item active"><img src="../../media/cache/{img_a}/{img_b}/{img_hash}.jpg" alt="{title}" /></div>
+</div></div></div>
+</div>
+<div class="col-sm-6 product_main">
+<h1>{title}</h1>
+<p class="price_color">£{price:.2f}</p>
+<p class="instock availability">
+    <i class="icon-ok"></i>
+        In stock ({stock} available)
+</p>
+<p class="star-rating {rating_name}">
+    <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+    <i class="icon-star"></i><i class="icon-star"></i>
+</p>
+<hr/>
+<div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website.</div>
+</div>
+</div>
+<div id="product_description" class="sub-header"><h2>Product Description</h2></div>
+<p>{description}</p>
+<div class="sub-header"><h2>Product Information</h2></div>
+<table class="table table-striped">
+<tr><th>UPC</th><td>{upc}</td></tr>
+<tr><th>Product Type</th><td>Books</td></tr>
+<tr><th>Price (excl. tax)</th><td>£{price:.2f}</td></tr>
+<tr><th>Price (incl. tax)</th><td>£{price:.2f}</td></tr>
+<tr><th>Tax</th><td>£0.00</td></tr>
+<tr><th>Availability</th><td>In stock ({stock} available)</td></tr>
+<tr><th>Number of reviews</th><td>0</td></tr>
+</table>
+</article>
+</div></div>
+"""
+
+_POD = """<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+<article class="product_pod">
+<div class="image_container"><a href="{href}"><img src="{root}media/cache/{img_a}/{img_b}/{img_hash}.jpg"
+ alt="{title}" class="thumbnail"></a></div>
+<p class="star-rating {rating_name}"><i class="icon-star"></i><i class="icon-star"></i></p>
+<h3><a href="{href}" title="{title}">{title}</a></h3>
+<div class="product_price"><p class="price_color">£{price:.2f}</p>
+<p class="instock availability"><i class="icon-ok"></i> In stock</p>
+<form><button type="submit" class="btn btn-primary btn-block">Add to basket</button></form></div>
+</article>
+</li>
+"""
+
+
+def _slug(text: str) -> str:
+    return "".join(ch if ch.isalnum() else "-" for ch in text.lower()).strip("-")
+
+
+def site_pages(n_books: int, per_page: int = 20, seed: int = 42) -> dict:
+    """
+    Gera {caminho relativo: html} com a estrutura de books.toscrape.com:
+    index.html, catalogue/page-N.html e catalogue/<slug>_<n>/index.html.
+    """
+    books = make_books(n_books, seed)
+    pages = {}
+    pods = []
+    for row in books.itertuples(index=False):
+        slug = f"{_slug(row.title)}_{row.id}"
+        img_hash = f"{row.id:032x}"
+        fields = {
+            "title": row.title,
+            "price": float(row.price.lstrip("£")),
+            "stock": int(row.availability.split("(")[1].split()[0]),
+            "rating_name": _RATING_NAMES[int(row.rating) - 1],
+            "category": row.category,
+            "category_slug": _slug(row.category),
+            "category_id": _CATEGORIES.index(row.category) + 2,
+            "img_a": img_hash[:2],
+            "img_b": img_hash[2:4],
+            "img_hash": img_hash,
+            "upc": f"{row.id:016x}",
+            "description": " ".join([row.title] * 12),
+        }
+        body = _BOOK_BODY.format(**fields)
+        html = _HEAD.format(root="../../", **fields) + body + _FOOT.format(root="../../")
+        pages[f"catalogue/{slug}/index.html"] = html
+        pods.append((slug, fields))
+
+    n_pages = max(1, -(-len(pods) // per_page))
+    for page in range(1, n_pages + 1):
+        # a primeira página fica na raiz; as demais em catalogue/ (como no site real)
+        prefix, root = ("catalogue/", "") if page == 1 else ("", "../")
+        chunk = pods[(page - 1) * per_page: page * per_page]
+        items = "".join(_POD.format(href=f"{prefix}{slug}/index.html", root=root, **fields) for slug, fields in chunk)
+        pager = f'<li class="current">Page {page} of {n_pages}</li>'
+        if page < n_pages:
+            pager += f'<li class="next"><a href="{prefix}page-{page + 1}.html">next</a></li>'
+        body = (
+            '<div class="content"><section><ol class="row">' + items + "</ol>"
+            '<div><ul class="pager">' + pager + "</ul></div></section></div>"
+        )
+        path = "index.html" if page == 1 else f"catalogue/page-{page}.html"
+        pages[path] = _HEAD.format(root=root, title="All products") + body + _FOOT.format(root=root)
+    return pages
+
+
+def write_site(root, n_books: int, per_page: int = 20, seed: int = 42) -> int:
+    """Grava o site sintético em `root`; retorna o número de páginas."""
+    pages = site_pages(n_books, per_page, seed)
+    for rel, html in pages.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+    return len(pages)
+
+
+@contextlib.contextmanager
+def serve_site(root, latency: float = 0.0):
+    """Servidor HTTP local (thread) servindo `root`; devolve a URL base."""
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(root), **kwargs)
+
+        def end_headers(self):
+            # latência artificial de rede por resposta
+            if latency:
+                time.sleep(latency)
+            super().end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,59 @@
+# scripts/page_cache.py
+"""
+Cache em disco das páginas baixadas pelo scraper.
+Para cada URL guarda ETag, Last-Modified, o hash do conteúdo e o resultado
+já parseado, permitindo requisições condicionais (304) e evitar o parse de
+páginas que não mudaram.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, url: str) -> dict | None:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, etag: str | None, last_modified: str | None, digest: str, parsed) -> dict:
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "parsed": parsed,
+        }
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # escrita atômica: um crawl interrompido não deixa entrada corrompida
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
@@ -0,0 +1,184 @@
+# scripts/parsers.py
+"""
+Backends de parse do HTML de books.toscrape.com.
+Todos recebem os bytes da resposta (sem decodificar para texto antes) e
+extraem os mesmos campos. Os backends rápidos (selectolax, lxml) são
+opcionais; sem eles o parser padrão é o BeautifulSoup com html.parser.
+"""
+
+import logging
+from typing import Callable, NamedTuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+try:  # backends opcionais
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+# função de conversão de rating textual para inteiro
+def rating_to_int(rating_str: str) -> int | None:
+    mapping = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+    return mapping.get(rating_str, None)
+
+
+def _rating_from_classes(classes) -> int | None:
+    rating = None
+    for c in classes:
+        if c != "star-rating":
+            rating = rating_to_int(c)
+    return rating
+
+
+def _book(title, price, availability, rating, category, image_src, book_url) -> dict:
+    return {
+        "title": title,
+        "price": price,
+        "rating": rating,
+        "availability": availability,
+        "category": category,
+        "image_url": urljoin(book_url, image_src) if image_src else None,
+        "book_url": book_url,
+    }
+
+
+# --- BeautifulSoup + html.parser (padrão, sempre disponível) ---
+
+def bs4_parse_book(content: bytes, book_url: str) -> dict:
+    soup = BeautifulSoup(content, "html.parser")
+    rating_tag = soup.select_one("p.star-rating")
+    crumbs = soup.select("ul.breadcrumb li a")
+    img_tag = soup.select_one("div.thumbnail img")
+    return _book(
+        title=soup.select_one("div.product_main > h1").get_text(strip=True),
+        price=soup.select_one("p.price_color").get_text(strip=True),
+        availability=soup.select_one("p.availability").get_text(strip=True),
+        rating=_rating_from_classes(rating_tag.get("class", [])) if rating_tag else None,
+        # categoria pelo breadcrumb (terceiro link)
+        category=crumbs[2].get_text(strip=True) if len(crumbs) >= 3 else None,
+        image_src=img_tag.get("src") if img_tag else None,
+        book_url=book_url,
+    )
+
+
+def bs4_parse_listing(content: bytes, page_url: str) -> tuple[list[str], str | None]:
+    soup = BeautifulSoup(content, "html.parser")
+    links = [urljoin(page_url, a.get("href")) for a in soup.select("article.product_pod h3 a")]
+    next_tag = soup.select_one("li.next > a")
+    return links, urljoin(page_url, next_tag.get("href")) if next_tag else None
+
+
+# --- selectolax (Lexbor, C) ---
+
+def _sx_text(node) -> str:
+    return node.text(deep=True, separator="", strip=True)
+
+
+def selectolax_parse_book(content: bytes, book_url: str) -> dict:
+    # Lexbor decodifica os bytes como UTF-8 (charset declarado pelo site)
+    tree = SelectolaxParser(content)
+    rating_tag = tree.css_first("p.star-rating")
+    crumbs = tree.css("ul.breadcrumb li a")
+    img_tag = tree.css_first("div.thumbnail img")
+    return _book(
+        title=_sx_text(tree.css_first("div.product_main > h1")),
+        price=_sx_text(tree.css_first("p.price_color")),
+        availability=_sx_text(tree.css_first("p.availability")),
+        rating=_rating_from_classes((rating_tag.attributes.get("class") or "").split()) if rating_tag else None,
+        category=_sx_text(crumbs[2]) if len(crumbs) >= 3 else None,
+        image_src=img_tag.attributes.get("src") if img_tag else None,
+        book_url=book_url,
+    )
+
+
+def selectolax_parse_listing(content: bytes, page_url: str) -> tuple[list[str], str | None]:
+    tree = SelectolaxParser(content)
+    links = [urljoin(page_url, a.attributes.get("href")) for a in tree.css("article.product_pod h3 a")]
+    next_tag = tree.css_first("li.next > a")
+    return links, urljoin(page_url, next_tag.attributes.get("href")) if next_tag else None
+
+
+# --- lxml (libxml2, XPath) ---
+
+def _has_class(tag: str, name: str) -> str:
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+
+_LX_TITLE = f"//{_has_class('div', 'product_main')}/h1"
+_LX_PRICE = f"//{_has_class('p', 'price_color')}"
+_LX_AVAILABILITY = f"//{_has_class('p', 'availability')}"
+_LX_RATING = f"//{_has_class('p', 'star-rating')}"
+_LX_CRUMBS = f"//{_has_class('ul', 'breadcrumb')}//li//a"
+_LX_IMAGE = f"//{_has_class('div', 'thumbnail')}//img"
+_LX_LINKS = f"//{_has_class('article', 'product_pod')}//h3//a"
+_LX_NEXT = f"//{_has_class('li', 'next')}/a"
+
+
+def _lx_text(el) -> str:
+    return "".join(t.strip() for t in el.itertext())
+
+
+def _lx_first(tree, xpath):
+    found = tree.xpath(xpath)
+    return found[0] if found else None
+
+
+def lxml_parse_book(content: bytes, book_url: str) -> dict:
+    tree = lxml_html.fromstring(content)
+    rating_tag = _lx_first(tree, _LX_RATING)
+    crumbs = tree.xpath(_LX_CRUMBS)
+    img_tag = _lx_first(tree, _LX_IMAGE)
+    return _book(
+        title=_lx_text(_lx_first(tree, _LX_TITLE)),
+        price=_lx_text(_lx_first(tree, _LX_PRICE)),
+        availability=_lx_text(_lx_first(tree, _LX_AVAILABILITY)),
+        rating=_rating_from_classes(rating_tag.get("class", "").split()) if rating_tag is not None else None,
+        category=_lx_text(crumbs[2]) if len(crumbs) >= 3 else None,
+        image_src=img_tag.get("src") if img_tag is not None else None,
+        book_url=book_url,
+    )
+
+
+def lxml_parse_listing(content: bytes, page_url: str) -> tuple[list[str], str | None]:
+    tree = lxml_html.fromstring(content)
+    links = [urljoin(page_url, a.get("href")) for a in tree.xpath(_LX_LINKS)]
+    next_tag = _lx_first(tree, _LX_NEXT)
+    return links, urljoin(page_url, next_tag.get("href")) if next_tag is not None else None
+
+
+class ParserBackend(NamedTuple):
+    name: str
+    parse_book: Callable[[bytes, str], dict]
+    parse_listing: Callable[[bytes, str], tuple]
+
+
+# ordem de preferência do modo "auto"
+BACKENDS = {
+    "selectolax": ParserBackend("selectolax", selectolax_parse_book, selectolax_parse_listing),
+    "lxml": ParserBackend("lxml", lxml_parse_book, lxml_parse_listing),
+    "bs4": ParserBackend("bs4", bs4_parse_book, bs4_parse_listing),
+}
+
+_INSTALLED = {"selectolax": SelectolaxParser is not None, "lxml": lxml_html is not None, "bs4": True}
+
+
+def available_backends() -> list[str]:
+    return [name for name in BACKENDS if _INSTALLED[name]]
+
+
+def get_parser(name: str = "auto") -> ParserBackend:
+    """Backend pelo nome; "auto" escolhe o mais rápido instalado. Sem ele, cai no bs4."""
+    name = (name or "auto").lower()
+    if name == "auto":
+        return BACKENDS[available_backends()[0]]
+    if name not in BACKENDS or not _INSTALLED[name]:
+        logger.warning("Parser '%s' indisponível; usando bs4", name)
+        return BACKENDS["bs4"]
+    return BACKENDS[name]
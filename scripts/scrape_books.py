@@ -2,126 +2,445 @@
 """
 Script de scraping que coleta todos os livros de https://books.toscrape.com/
 Salva o resultado em CSV no caminho definido por api.config.settings.DATA_PATH
+
+O crawler é assíncrono (httpx + asyncio): as páginas de listagem são
+percorridas em sequência e cada link de livro entra numa fila consumida por
+até SCRAPER_MAX_CONCURRENCY workers. Um limitador por host substitui os
+sleeps fixos e os retries seguem a mesma política de create_requests_session.
+
+O parse usa o backend de SCRAPER_PARSER (selectolax/lxml quando instalados,
+senão BeautifulSoup) direto sobre os bytes da resposta; opcionalmente num
+pool de processos (SCRAPER_PARSE_WORKERS) para usar mais de um núcleo.
+
+Com o cache de páginas (SCRAPER_CACHE_DIR) as requisições são condicionais
+(ETag/Last-Modified), páginas inalteradas não são parseadas de novo e apenas
+livros novos ou alterados são mesclados ao CSV existente, mantendo os ids.
 """
 
 import os
-import time
+import math
+import asyncio
 import logging
-from urllib.parse import urljoin
+import multiprocessing
+import email.utils
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import httpx
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from bs4 import BeautifulSoup
 import pandas as pd
 
 # carrega as configurações do projeto
 from api.config import settings
+from api.aggregates import Aggregates
+from api.snapshot import read_aggregates, snapshot_is_current, snapshot_path, write_snapshot
+from api.compact import compact_books
+from api.utils import prepare_books
+from scripts.page_cache import PageCache, content_hash
+from scripts.parsers import ParserBackend, get_parser, rating_to_int
 
 # configuração logging básico conforme LOG_LEVEL
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
 logger = logging.getLogger(__name__)
 
-# função de conversão de rating textual para inteiro
-def rating_to_int(rating_str: str) -> int | None:
-    mapping = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
-    return mapping.get(rating_str, None)
+USER_AGENT = "books-scraper/1.0 (+https://example.com)"
+
+# colunas do CSV (além do id)
+BOOK_FIELDS = ["title", "price", "rating", "availability", "category", "image_url", "book_url"]
+
+# política de retry (mesma do Retry usado em create_requests_session)
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_BACKOFF_MAX = 120
+RETRY_STATUS_FORCELIST = frozenset({429, 500, 502, 503, 504})
 
 # cria sessão com retry para maior robustez em requisições
 def create_requests_session() -> requests.Session:
     session = requests.Session()
-    retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    retries = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=sorted(RETRY_STATUS_FORCELIST),
+    )
     session.mount("https://", HTTPAdapter(max_retries=retries))
-    session.headers.update({"User-Agent": "books-scraper/1.0 (+https://example.com)"})
+    session.headers.update({"User-Agent": USER_AGENT})
     return session
 
-# parse da página de detalhe do livro
-def parse_book_page(session: requests.Session, book_url: str) -> dict:
+# parse da página de detalhe do livro (caminho síncrono, uma página)
+def parse_book_page(session: requests.Session, book_url: str, parser: str | None = None) -> dict:
     resp = session.get(book_url, timeout=10)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # título
-    title = soup.select_one("div.product_main > h1").get_text(strip=True)
-
-    # preço (ex.: '53.74')
-    price = soup.select_one("p.price_color").get_text(strip=True)
-
-    # disponibilidade
-    availability = soup.select_one("p.availability").get_text(strip=True)
-
-    # rating: <p class="star-rating Three">
-    rating_tag = soup.select_one("p.star-rating")
-    rating = None
-    if rating_tag:
-        classes = rating_tag.get("class", [])
-        for c in classes:
-            if c != "star-rating":
-                rating = rating_to_int(c)
-
-    # categoria pelo breadcrumb (terceiro link)
-    category_name = None
-    crumbs = soup.select("ul.breadcrumb li a")
-    if len(crumbs) >= 3:
-        category_name = crumbs[2].get_text(strip=True)
-
-    # imagem (src relativo -> torna-se absoluto)
-    img_tag = soup.select_one("div.thumbnail img")
-    image_url = None
-    if img_tag:
-        src = img_tag.get("src")
-        image_url = urljoin(book_url, src)
-
-    return {
-        "title": title,
-        "price": price,
-        "rating": rating,
-        "availability": availability,
-        "category": category_name,
-        "image_url": image_url,
-        "book_url": book_url
-    }
+    # os bytes vão direto para o parser, que detecta o charset pela meta tag
+    return get_parser(parser or settings.SCRAPER_PARSER).parse_book(resp.content, book_url)
 
-# função principal que percorre todas as páginas e livros
-def scrape_all_books(output_path: str = settings.DATA_PATH) -> list:
-    session = create_requests_session()
-    books = []
 
-    page_url = settings.SCRAPER_BASE_URL  # começa na raiz do site
+# --- Crawler assíncrono ---
+
+class HostRateLimiter:
+    """Garante no máximo `rate` requisições por segundo para cada host (0 = sem limite)."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        if not self._interval:
+            return
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _backoff(attempt: int) -> float:
+    # mesma fórmula do urllib3: sem espera no primeiro retry, depois exponencial
+    if attempt <= 1:
+        return 0.0
+    return min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_FACTOR * (2 ** (attempt - 1)))
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        # data HTTP; inválida ou sem fuso (naive) -> None e fetch usa o _backoff
+        try:
+            parsed = email.utils.parsedate_to_datetime(value)
+            seconds = (parsed - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, seconds) if math.isfinite(seconds) else None
+
+
+def create_async_client(max_concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    return httpx.AsyncClient(headers={"User-Agent": USER_AGENT}, timeout=10, limits=limits, follow_redirects=True)
+
+
+async def fetch(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: HostRateLimiter,
+    headers: dict | None = None,
+) -> httpx.Response:
+    """GET com retry em erros de conexão e status 429/5xx, respeitando Retry-After. 304 é sucesso."""
+    attempt = 0
     while True:
-        logger.info("Buscando página: %s", page_url)
-        resp = session.get(page_url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # encontra todos os links de livro na página
-        for a in soup.select("article.product_pod h3 a"):
-            href = a.get("href")
-            book_url = urljoin(page_url, href)
-            try:
-                book = parse_book_page(session, book_url)
-                books.append(book)
-                logger.debug("Livro coletado: %s", book["title"])
-                # pequeno delay para não sobrecarregar o servidor
-                time.sleep(0.2)
-            except Exception as e:
-                logger.warning("Erro ao coletar %s: %s", book_url, str(e))
-
-        # detecta link "next" para paginação; se não houver, encerra
-        next_tag = soup.select_one("li.next > a")
-        if next_tag:
-            next_href = next_tag.get("href")
-            page_url = urljoin(page_url, next_href)
-            time.sleep(0.5)
+        await limiter.wait(url)
+        delay = None
+        try:
+            resp = await client.get(url, headers=headers)
+        except httpx.TransportError:
+            if attempt >= RETRY_TOTAL:
+                raise
+        else:
+            if resp.status_code == 304:
+                return resp
+            if resp.status_code not in RETRY_STATUS_FORCELIST or attempt >= RETRY_TOTAL:
+                resp.raise_for_status()
+                return resp
+            if resp.status_code in (429, 503):
+                delay = _retry_after(resp)
+        attempt += 1
+        await asyncio.sleep(_backoff(attempt) if delay is None else delay)
+
+
+class FetchedPage(NamedTuple):
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    cached: dict | None  # entrada do cache cujo parse ainda vale (conteúdo inalterado)
+
+
+async def fetch_page(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: HostRateLimiter,
+    cache: PageCache | None = None,
+    stats: dict | None = None,
+) -> FetchedPage:
+    """Baixa `url`; com cache, a requisição é condicional e páginas inalteradas trazem o parse salvo."""
+    entry = cache.get(url) if cache else None
+    resp = await fetch(client, url, limiter, PageCache.conditional_headers(entry))
+    _count(stats, "pages")
+    if resp.status_code == 304 and entry is not None:
+        _count(stats, "not_modified")
+        return FetchedPage(b"", entry.get("etag"), entry.get("last_modified"), entry["hash"], entry)
+
+    digest = content_hash(resp.content)
+    page = FetchedPage(resp.content, resp.headers.get("etag"), resp.headers.get("last-modified"), digest, None)
+    if entry is not None and entry["hash"] == digest:
+        _count(stats, "unchanged")
+        if (entry.get("etag"), entry.get("last_modified")) != (page.etag, page.last_modified):
+            cache.put(url, page.etag, page.last_modified, digest, entry["parsed"])
+        return page._replace(cached=entry)
+    _count(stats, "parsed")
+    return page
+
+
+def store_parsed(cache: PageCache | None, url: str, page: FetchedPage, parsed):
+    if cache:
+        cache.put(url, page.etag, page.last_modified, page.digest, parsed)
+
+
+async def fetch_parsed(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: HostRateLimiter,
+    parse,
+    cache: PageCache | None = None,
+    stats: dict | None = None,
+):
+    """Baixa e parseia `url` no próprio processo, reaproveitando o parse de páginas inalteradas."""
+    page = await fetch_page(client, url, limiter, cache, stats)
+    if page.cached is not None:
+        return page.cached["parsed"]
+    parsed = parse(page.content, url)
+    store_parsed(cache, url, page, parsed)
+    return parsed
+
+
+def _count(stats: dict | None, key: str):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
+
+
+def _listing_entry(backend: ParserBackend):
+    # formato serializável em JSON para o cache de páginas
+    def parse(content: bytes, page_url: str) -> dict:
+        links, next_url = backend.parse_listing(content, page_url)
+        return {"links": links, "next": next_url}
+    return parse
+
+
+async def crawl_books(
+    base_url: str | None = None,
+    max_concurrency: int | None = None,
+    rate_limit: float | None = None,
+    cache: PageCache | None = None,
+    parser: str | None = None,
+    parse_workers: int | None = None,
+    parse_queue_size: int | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> list:
+    """
+    Percorre listagem -> detalhes em pipeline e devolve os livros na ordem do site.
+    Com parse_workers > 0 os bytes das páginas de detalhe são parseados num
+    ProcessPoolExecutor enquanto os downloads continuam; no máximo
+    parse_queue_size parses ficam pendentes (backpressure sobre os downloads).
+    `progress` recebe os contadores (pages, books, errors, ...) a cada página.
+    """
+    base_url = base_url or settings.SCRAPER_BASE_URL
+    backend = get_parser(parser or settings.SCRAPER_PARSER)
+    parse_listing = _listing_entry(backend)
+    max_concurrency = max(1, max_concurrency or settings.SCRAPER_MAX_CONCURRENCY)
+    limiter = HostRateLimiter(settings.SCRAPER_RATE_LIMIT if rate_limit is None else rate_limit)
+    parse_workers = settings.SCRAPER_PARSE_WORKERS if parse_workers is None else parse_workers
+    parse_queue_size = max(1, parse_queue_size or settings.SCRAPER_PARSE_QUEUE_SIZE)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
+    results: dict[int, dict] = {}
+    pending: dict[int, asyncio.Future] = {}  # parses ainda em andamento (seq -> future)
+    stats: dict[str, int] = {}
+
+    def report():
+        if progress is not None:
+            progress({**stats, "books": len(results)})
+
+    # spawn: o scraper também roda a partir de threads da API, onde fork não é seguro
+    pool = None
+    if parse_workers > 0:
+        pool = ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context("spawn"))
+    parse_slots = asyncio.Semaphore(parse_queue_size)
+    loop = asyncio.get_running_loop()
+
+    def harvest(seq: int, book_url: str, page: FetchedPage, future: asyncio.Future):
+        # no event loop, assim que o parse termina: o resultado entra em `results`
+        # e os bytes da página são liberados (memória limitada por parse_queue_size)
+        parse_slots.release()
+        del pending[seq]
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            _count(stats, "errors")
+            logger.warning("Erro ao coletar %s: %s", book_url, str(future.exception()))
         else:
-            break
-
-    # salva CSV
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df = pd.DataFrame(books)
-    df.insert(0, "id", range(1, len(df) + 1))
-    df.to_csv(output_path, index=False)
-    logger.info("Salvo %d livros em %s", len(df), output_path)
+            results[seq] = future.result()
+            store_parsed(cache, book_url, page, results[seq])
+        report()
+
+    async def submit_parse(seq: int, book_url: str, page: FetchedPage):
+        await parse_slots.acquire()
+        future = loop.run_in_executor(pool, backend.parse_book, page.content, book_url)
+        pending[seq] = future
+        future.add_done_callback(functools.partial(harvest, seq, book_url, page))
+
+    async with create_async_client(max_concurrency) as client:
+
+        async def produce_links():
+            seq = 0
+            page_url = base_url  # começa na raiz do site
+            while page_url:
+                logger.info("Buscando página: %s", page_url)
+                listing = await fetch_parsed(client, page_url, limiter, parse_listing, cache, stats)
+                report()
+                page_url = listing["next"]
+                for book_url in listing["links"]:
+                    await queue.put((seq, book_url))
+                    seq += 1
+            for _ in range(max_concurrency):
+                await queue.put(None)
+
+        async def collect_books():
+            while (item := await queue.get()) is not None:
+                seq, book_url = item
+                try:
+                    if pool is None:
+                        results[seq] = await fetch_parsed(client, book_url, limiter, backend.parse_book, cache, stats)
+                        logger.debug("Livro coletado: %s", results[seq]["title"])
+                    else:
+                        page = await fetch_page(client, book_url, limiter, cache, stats)
+                        if page.cached is not None:
+                            results[seq] = page.cached["parsed"]
+                        else:
+                            await submit_parse(seq, book_url, page)
+                except Exception as e:
+                    _count(stats, "errors")
+                    logger.warning("Erro ao coletar %s: %s", book_url, str(e))
+                report()
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(produce_links())
+                for _ in range(max_concurrency):
+                    tg.create_task(collect_books())
+        except ExceptionGroup as eg:
+            # falha numa página de listagem interrompe o crawl (como no fluxo síncrono)
+            raise eg.exceptions[0]
+        finally:
+            if pool is not None:
+                # espera os últimos parses; harvest já guarda cada resultado
+                await asyncio.gather(*pending.values(), return_exceptions=True)
+                pool.shutdown(cancel_futures=True)
+
+    if cache:
+        logger.info("Cache de páginas: %s", stats)
+    return [results[seq] for seq in sorted(results)]
+
+
+def merge_books(existing: pd.DataFrame | None, books: list) -> tuple[pd.DataFrame, dict]:
+    """
+    Mescla os livros coletados no dataset existente usando book_url como chave.
+    Livros conhecidos mantêm o id (e só são reescritos se algum campo mudou);
+    livros novos recebem ids a partir do maior id existente. Livros que não
+    apareceram neste crawl são mantidos.
+    """
+    result, counts, _ = merge_books_delta(existing, books)
+    return result, counts
+
+
+def merge_books_delta(existing: pd.DataFrame | None, books: list) -> tuple[pd.DataFrame, dict, dict | None]:
+    """
+    Como merge_books, devolvendo também o delta em relação a `existing`:
+    {"removed": linhas que saíram (versões antigas), "added": linhas que entraram}.
+    O delta é None quando não há dataset anterior.
+    """
+    scraped = pd.DataFrame(books, columns=BOOK_FIELDS).drop_duplicates("book_url")
+    if existing is None or existing.empty:
+        scraped.insert(0, "id", range(1, len(scraped) + 1))
+        return scraped, {"new": len(scraped), "changed": 0, "unchanged": 0}, None
+
+    merged = existing.drop_duplicates("book_url").set_index("book_url", drop=False)
+    scraped = scraped.set_index("book_url", drop=False)
+    known = scraped.index.isin(merged.index)
+
+    common = scraped.index[known]
+    old = merged.loc[common, BOOK_FIELDS]
+    new = scraped.loc[common, BOOK_FIELDS]
+    same = ((old == new) | (old.isna() & new.isna())).all(axis=1)
+    changed = common[~same.to_numpy()]
+    # versões antigas dos alterados + duplicatas de book_url descartadas
+    removed = pd.concat([merged.loc[changed], existing[existing.duplicated("book_url")]], ignore_index=True)
+    if len(changed):
+        merged = merged.astype({c: object for c in BOOK_FIELDS})
+        merged.loc[changed, BOOK_FIELDS] = scraped.loc[changed, BOOK_FIELDS]
+
+    added = scraped[~known].reset_index(drop=True)
+    next_id = int(merged["id"].max()) + 1 if len(merged) else 1
+    added.insert(0, "id", range(next_id, next_id + len(added)))
+
+    result = pd.concat([merged.reset_index(drop=True)[["id"] + BOOK_FIELDS], added], ignore_index=True)
+    counts = {"new": len(added), "changed": len(changed), "unchanged": int(same.sum())}
+    delta = {
+        "removed": removed.reset_index(drop=True)[["id"] + BOOK_FIELDS],
+        "added": pd.concat([merged.loc[changed].reset_index(drop=True)[["id"] + BOOK_FIELDS], added],
+                           ignore_index=True),
+    }
+    return result, counts, delta
+
+
+def update_aggregates(output_path: str, df: pd.DataFrame, delta: dict | None) -> Aggregates:
+    """
+    Agregados da nova versão: os do snapshot atual mais o delta do merge, sem
+    reler o catálogo. Sem snapshot em dia com o CSV, recalcula tudo.
+    """
+    snapshot = snapshot_path(output_path)
+    stored = read_aggregates(snapshot) if delta is not None and snapshot_is_current(snapshot, output_path) else None
+    aggregates = Aggregates.from_dict(stored) if stored else None
+    if aggregates is None:
+        return Aggregates.from_frame(prepare_books(df.copy()))
+    aggregates.remove(prepare_books(delta["removed"].copy()))
+    aggregates.add(prepare_books(delta["added"].copy()))
+    return aggregates
+
+
+def save_books(books: list, output_path: str, incremental: bool = True) -> pd.DataFrame:
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    existing = pd.read_csv(output_path) if incremental and os.path.exists(output_path) else None
+    df, counts, delta = merge_books_delta(existing, books)
+    aggregates = update_aggregates(output_path, df, delta)
+    # grava num temporário e publica com rename: a API nunca lê um CSV pela metade.
+    # O snapshot sai antes do rename (que preserva mtime/tamanho), então quando a
+    # nova versão do CSV aparece o snapshot correspondente já está pronto.
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    df.to_csv(tmp_path, index=False)
+    write_snapshot(compact_books(prepare_books(df.copy())), snapshot_path(output_path), source=tmp_path,
+                   aggregates=aggregates.to_dict())
+    os.replace(tmp_path, output_path)
+    logger.info("Salvo %d livros em %s (%s)", len(df), output_path, counts)
+    return df
+
+# função principal que percorre todas as páginas e livros
+def scrape_all_books(
+    output_path: str = settings.DATA_PATH,
+    base_url: str | None = None,
+    max_concurrency: int | None = None,
+    rate_limit: float | None = None,
+    cache_dir: str | None = None,
+    incremental: bool = True,
+    parser: str | None = None,
+    parse_workers: int | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> list:
+    cache_dir = settings.SCRAPER_CACHE_DIR if cache_dir is None else cache_dir
+    cache = PageCache(cache_dir) if cache_dir and incremental else None
+    books = asyncio.run(
+        crawl_books(base_url, max_concurrency, rate_limit, cache, parser, parse_workers, progress=progress)
+    )
+    save_books(books, output_path, incremental)
     return books
 
 # execução direta
 if __name__ == "__main__":
-    scrape_all_books()
\ No newline at end of file
+    scrape_all_books()
@@ -1,9 +1,438 @@
 # tests/test_api.py
+import io
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
 from api.main import app
+from api.auth import TokenCache, token_cache
+from api import catalog, pagination
+from api.config import settings
+from api.dataset import DatasetProvider, dataset_provider
+from api.aggregates import Aggregates
+from api.price_model import CategoryPriceModel
+from api.search import SearchIndex
+from api.compact import compact_books, memory_report
+from api.snapshot import snapshot_path, write_snapshot
+from api.utils import load_data, prepare_books
+from benchmarks.synthetic import make_books
 
 client = TestClient(app)
 
 def test_health():
     resp = client.get("/api/v1/health")
-    assert resp.status_code in (200, 500)  # 200 se dataset carregado, 500 se não carregado
\ No newline at end of file
+    assert resp.status_code in (200, 503)  # 200 se dataset carregado, 503 se não carregado
+
+def _pandas_search(df, title=None, category=None, min_price=None, max_price=None):
+    if title:
+        df = df[df["title"].str.contains(title, case=False, na=False)]
+    if category:
+        df = df[df["category"].str.contains(category, case=False, na=False)]
+    if min_price is not None:
+        df = df[df["price_num"] >= min_price]
+    if max_price is not None:
+        df = df[df["price_num"] <= max_price]
+    return df.index.tolist()
+
+def test_search_index_matches_pandas():
+    df = prepare_books(make_books(2000))
+    # títulos não ASCII: "İ".lower() tem dois caracteres, mas re.IGNORECASE casa "İ" com "i"
+    df.loc[df.index[:3], "title"] = ["İstanbul Nights", "Straße der Gärten", "KELVIN \u212a garden"]
+    index = SearchIndex(df)
+    queries = [
+        {"title": "garden"}, {"title": "GAR"}, {"title": "of"}, {"title": "zzz"},
+        {"title": "st.ne"}, {"category": "fiction"}, {"category": "poetry", "title": "the"},
+        {"min_price": 20.0, "max_price": 25.0}, {"max_price": 10.5}, {"title": "night", "min_price": 40},
+        {"title": "ist"}, {"title": "İST"}, {"title": "straße"}, {"title": "GÄRTEN"}, {"title": "k gar"},
+    ]
+    for query in queries:
+        assert index.search(**query).tolist() == _pandas_search(df, **query), query
+
+def test_get_book_and_top_rated():
+    # o context manager executa o evento de startup (carrega data/books.csv)
+    with TestClient(app) as loaded:
+        resp = loaded.get("/api/v1/books/3")
+        assert resp.status_code == 200
+        assert resp.json()["id"] == 3
+        assert loaded.get("/api/v1/books/999999").status_code == 404
+
+        ratings = [b["rating"] for b in loaded.get("/api/v1/books/top-rated?limit=50").json()]
+        assert len(ratings) == 50
+        assert ratings == sorted(ratings, reverse=True)
+
+def test_cached_responses_support_etag_and_gzip():
+    with TestClient(app) as loaded:
+        first = loaded.get("/api/v1/categories")
+        assert first.status_code == 200
+        assert "Poetry" in first.json()["categories"]
+        etag = first.headers["etag"]
+
+        again = loaded.get("/api/v1/categories", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+
+        features = loaded.get("/api/v1/ml/features", headers={"Accept-Encoding": "gzip"})
+        assert features.headers["content-encoding"] == "gzip"
+        assert len(features.json()) == 1000
+
+def test_dataset_provider_swaps_snapshots(tmp_path):
+    path = tmp_path / "books.csv"
+    make_books(50).to_csv(path, index=False)
+    provider = DatasetProvider()
+    old = provider.load(str(path))
+
+    make_books(80, seed=1).to_csv(path, index=False)
+    new = provider.load(str(path))
+    # o snapshot antigo continua íntegro para quem ainda o referencia
+    assert provider.get() is new
+    assert (old.size, new.size) == (50, 80)
+    assert list(new.features.columns) == ["id", "title", "price_num", "rating", "category", "in_stock"]
+
+def test_category_price_model_matches_groupby():
+    df = prepare_books(make_books(500))
+    model = CategoryPriceModel.fit(df, "v1")
+    expected = df.groupby("category")["price_num"].mean()
+
+    predicted, base = model.predict(["Poetry", "Travel", "Unknown"], np.array([4.0, 2.0, 0.0]))
+    assert base[0] == pytest.approx(expected["Poetry"])
+    assert predicted[1] == pytest.approx(expected["Travel"] * 0.97)
+    assert base[2] == pytest.approx(df["price_num"].mean())
+    assert model.version == "v1"
+    incremental = CategoryPriceModel.from_aggregates(Aggregates.from_frame(df), "v1")
+    assert list(incremental.categories) == list(model.categories)
+    assert incremental.means == pytest.approx(model.means)
+
+def test_prepare_books_parses_mojibake_price_and_stock():
+    df = prepare_books(make_books(6))
+    df.loc[0, ["price", "availability"]] = ["Â£51.77", "In stock (22 available)"]
+    df.loc[1, "availability"] = "Out of stock"
+    df["price"] = ["Â£51.77", "£1,234.56", "£12.5 - £15", "1,23", "free", "$ 7"]
+    df = prepare_books(df)
+    assert df["price_num"].tolist()[:2] == [51.77, 1234.56]
+    assert df["price_num"][2:5].isna().all() and df.loc[5, "price_num"] == 7.0
+    assert df["stock"].tolist()[:2] == [22, 0]
+
+def test_load_data_prefers_current_snapshot(tmp_path):
+    path = str(tmp_path / "books.csv")
+    make_books(40).to_csv(path, index=False)
+    expected = load_data(path)
+    write_snapshot(expected, snapshot_path(path), source=path)
+
+    loaded = load_data(path)
+    pd.testing.assert_frame_equal(loaded, expected)
+    # colunas numéricas vêm do mmap (somente leitura, sem cópia privada)
+    assert not loaded["price_num"].to_numpy().flags.writeable
+
+    # CSV reescrito depois do snapshot: volta a ler o CSV
+    make_books(60, seed=1).to_csv(path, index=False)
+    assert len(load_data(path)) == 60
+
+def test_watcher_reloads_new_version_in_background(tmp_path):
+    path = str(tmp_path / "books.csv")
+    make_books(50).to_csv(path, index=False)
+    provider = DatasetProvider()
+    old = provider.load(path)
+    provider.watch(0.05, path)
+    try:
+        make_books(70, seed=1).to_csv(path, index=False)
+        deadline = time.monotonic() + 5
+        while provider.current is old and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        provider.stop_watching()
+    assert provider.current.size == 70
+    assert old.size == 50
+    assert not provider.reload_if_changed(path)
+
+def test_admin_dataset_status_requires_token():
+    with TestClient(app) as loaded:
+        assert loaded.get("/api/v1/admin/dataset").status_code in (401, 403)
+        token = loaded.post("/api/v1/auth/login", json={"username": "admin", "password": "admin123"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        info = loaded.get("/api/v1/admin/dataset", headers=headers).json()
+        assert info["rows"] == 1000
+        memory = info["memory"]
+        assert set(memory["indexes"]) == {"search", "catalog"} and min(memory["indexes"].values()) > 0
+        assert memory["total_bytes"] == memory["table_bytes"] + sum(memory["indexes"].values())
+        assert info["load_seconds"] >= 0
+        reload = loaded.post("/api/v1/admin/dataset/reload", headers=headers).json()
+        assert reload["reloaded"] is False
+        assert reload["version"] == info["version"]
+
+def test_streaming_export_matches_json_and_resumes():
+    with TestClient(app) as loaded:
+        full = loaded.get("/api/v1/ml/training-data").json()["records"]
+        stream = loaded.get("/api/v1/ml/training-data/stream", params={"batch_size": 128})
+        assert stream.headers["content-type"] == "application/x-ndjson"
+        version = stream.headers["x-dataset-version"]
+        assert [json.loads(line) for line in stream.text.splitlines()] == full
+
+        # retomada: offset = linhas já recebidas, na mesma versão
+        resumed = loaded.get(
+            "/api/v1/ml/features/stream",
+            params={"format": "csv", "columns": "id,price_num", "offset": 990, "version": version},
+        )
+        tail = pd.read_csv(io.StringIO(resumed.text))
+        assert list(tail.columns) == ["id", "price_num"]
+        assert tail["id"].tolist() == list(range(991, 1001))
+
+        stale = loaded.get("/api/v1/ml/features/stream", params={"version": "outra"})
+        assert stale.status_code == 409
+
+def test_token_cache_hits_and_revocation():
+    token_cache.clear()
+    with TestClient(app) as loaded:
+        token = loaded.post("/api/v1/auth/login", json={"username": "admin", "password": "admin123"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        for _ in range(3):
+            assert loaded.get("/api/v1/admin/auth-cache", headers=headers).status_code == 200
+        stats = token_cache.stats()
+        assert (stats["misses"], stats["hits"]) == (1, 2)
+
+        assert loaded.post("/api/v1/auth/logout", headers=headers).status_code == 200
+        # revogado: recusado mesmo estando válido e já tendo passado pelo cache
+        assert loaded.get("/api/v1/admin/auth-cache", headers=headers).status_code == 401
+
+def test_token_cache_entries_expire_at_exp():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", {"username": "x"}, time.time() - 1)
+    assert cache.get("a") is None
+    cache.put("b", {"username": "x"}, time.time() + 60)
+    cache.put("c", {"username": "x"}, time.time() + 60)
+    cache.put("d", {"username": "x"}, time.time() + 60)
+    assert cache.get("b") is None and cache.get("d") == {"username": "x"}
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_json_path_matches_response_model(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(catalog, "orjson", None)
+    elif catalog.orjson is None:
+        pytest.skip("orjson não instalado")
+    urls = [
+        "/api/v1/books?skip=10&limit=50",
+        "/api/v1/books/search?title=the&limit=30",
+        "/api/v1/books/search?category=poetry&min_price=20",
+        "/api/v1/books/top-rated?limit=25",
+        "/api/v1/books/search?title=zzzz",
+    ]
+    with TestClient(app) as loaded:
+        expected = [loaded.get(url) for url in urls]
+        monkeypatch.setattr(settings, "FAST_JSON", True)
+        fast = [loaded.get(url) for url in urls]
+    for slow, quick in zip(expected, fast):
+        assert quick.headers["content-type"] == "application/json"
+        assert quick.json() == slow.json()
+        assert quick.content == slow.content
+
+def test_metrics_endpoint_reports_route_histograms_and_spans():
+    with TestClient(app) as loaded:
+        loaded.get("/api/v1/books/3")
+        loaded.get("/api/v1/books/search", params={"title": "the"})
+        text = loaded.get("/metrics").text
+    assert 'books_api_requests_total{method="GET",route="/api/v1/books/{book_id}",status="200"}' in text
+    assert 'books_api_request_duration_seconds_bucket{method="GET",route="/api/v1/books/search",le="+Inf"}' in text
+    for phase in ("dataset_load", "search_filter", "serialize"):
+        assert f'books_api_span_seconds_count{{span="{phase}"}}' in text
+    assert "books_api_dataset_rows 1000.0" in text
+
+def test_sampling_profiler_is_opt_in(monkeypatch):
+    stop = threading.Event()
+
+    def _busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=_busy_loop)
+    worker.start()
+    try:
+        with TestClient(app) as loaded:
+            token = loaded.post("/api/v1/auth/login", json={"username": "admin", "password": "admin123"}).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            params = {"seconds": 0.3, "interval_ms": 2}
+            assert loaded.post("/api/v1/admin/profile", params=params, headers=headers).status_code == 404
+            monkeypatch.setattr(settings, "PROFILER_ENABLED", True)
+            resp = loaded.post("/api/v1/admin/profile", params=params, headers=headers)
+    finally:
+        stop.set()
+        worker.join()
+    assert resp.status_code == 200
+    busy = [line for line in resp.text.splitlines() if "_busy_loop" in line]
+    assert busy and all(line.rsplit(" ", 1)[1].isdigit() for line in busy)
+
+def test_cursor_pagination_walks_sorted_search():
+    with TestClient(app) as loaded:
+        params = {"category": "fiction", "sort_by": "-price"}
+        full = loaded.get("/api/v1/books/search", params={**params, "limit": 1000}).json()
+        price = dataset_provider.current.df.set_index("id")["price_num"]
+        prices = price.loc[[b["id"] for b in full]].dropna().tolist()
+        assert len(full) > 7 and prices == sorted(prices, reverse=True)
+        assert "x-next-cursor" not in loaded.get("/api/v1/books/search", params={**params, "limit": 1000}).headers
+
+        pages, cursor = [], None
+        while True:
+            resp = loaded.get("/api/v1/books/search", params={**params, "limit": 7, "cursor": cursor})
+            assert resp.status_code == 200
+            pages += resp.json()
+            cursor = resp.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert pages == full
+
+        first = loaded.get("/api/v1/books", params={"sort_by": "title", "limit": 5})
+        titles = [b["title"].lower() for b in first.json()]
+        assert titles == sorted(titles)
+        # cursor de outra consulta ou de outra versão do dataset é recusado
+        cursor = first.headers["x-next-cursor"]
+        assert loaded.get("/api/v1/books", params={"sort_by": "price", "cursor": cursor}).status_code == 400
+        assert loaded.get("/api/v1/books", params={"sort_by": "rating!"}).status_code == 400
+        stale = pagination.encode_cursor("outra", ("books", "title"), 5)
+        assert loaded.get("/api/v1/books", params={"sort_by": "title", "cursor": stale}).status_code == 409
+
+def test_bulk_lookup_preserves_order_and_reports_missing():
+    with TestClient(app) as loaded:
+        body = {"ids": [7, 999999, 3, 7], "queries": [{"category": "poetry", "limit": 3}, {"title": "zzzz"}]}
+        resp = loaded.post("/api/v1/books/bulk", json=body).json()
+        assert [b["id"] for b in resp["books"]] == [7, 3, 7]
+        assert resp["books"][1] == loaded.get("/api/v1/books/3").json()
+        assert resp["missing"] == [999999]
+
+        poetry = loaded.get("/api/v1/books/search", params={"category": "poetry", "limit": 1000}).json()
+        assert resp["queries"][0] == {"total": len(poetry), "books": poetry[:3]}
+        assert resp["queries"][1] == {"total": 0, "books": []}
+        assert loaded.post("/api/v1/books/bulk", json={"ids": list(range(1001))}).status_code == 422
+        huge = loaded.post("/api/v1/books/bulk", json={"ids": [2**70, 3, -2**63 - 1]}).json()
+        assert [b["id"] for b in huge["books"]] == [3] and huge["missing"] == [2**70, -2**63 - 1]
+
+def test_compact_books_rebuilds_original_strings():
+    df = prepare_books(make_books(300))
+    df.loc[0, ["price", "availability", "image_url"]] = ["Â£51.77", "Out of stock", "relativo/x.jpg"]
+    df.loc[1, ["price", "book_url"]] = ["£7.5", None]  # fora do molde / nulo
+    df.loc[3, ["rating", "category", "title"]] = [None, None, None]
+    df = prepare_books(df)
+    compact = compact_books(df)
+    assert "availability" not in compact and "price" not in compact
+    assert isinstance(compact["category"].dtype, pd.CategoricalDtype)
+    assert memory_report(compact)["total_bytes"] < memory_report(df)["total_bytes"]
+
+    positions = np.arange(len(df))
+    expected = df[list(catalog.BOOK_FIELDS)].astype(object).where(df.notna(), None).to_dict(orient="records")
+    assert catalog.records(catalog.BookTable(compact), positions) == expected
+    # texto com o próprio marcador não tem molde sem ambiguidade: a coluna fica como texto
+    df.loc[2, "price"] = "£{}"
+    assert compact_books(df)["price"].tolist() == df["price"].tolist()
+
+def test_heavy_endpoint_sheds_load_without_blocking_cheap_routes(monkeypatch):
+    from api import concurrency, main
+
+    release = threading.Event()
+    search = main._search
+
+    def slow_search(ds, query):
+        release.wait(5)
+        return search(ds, query)
+
+    monkeypatch.setattr(main, "_search", slow_search)
+    monkeypatch.setitem(concurrency._limits, "search_books",
+                        concurrency.EndpointLimit("search_books", 1, 0, queue_timeout=5))
+    with TestClient(app) as loaded:
+        first = []
+        worker = threading.Thread(target=lambda: first.append(loaded.get("/api/v1/books/search?title=a")))
+        worker.start()
+        deadline = time.time() + 5
+        while concurrency._limits["search_books"].pending == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        # endpoint ocupado e sem fila: 503 imediato; rotas baratas seguem respondendo
+        shed = loaded.get("/api/v1/books/search?title=b")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == str(settings.RETRY_AFTER_SECONDS)
+        assert loaded.get("/api/v1/health").status_code == 200
+        assert loaded.get("/api/v1/books/3").status_code == 200
+        assert loaded.get("/api/v1/stats/overview").status_code == 200
+
+        release.set()
+        worker.join(5)
+        assert first[0].status_code == 200
+        assert loaded.get("/api/v1/books/search?title=b").status_code == 200
+        assert 'books_api_shed_total{endpoint="search_books",reason="queue_full"}' in loaded.get("/metrics").text
+
+def test_predictions_validate_body_off_the_event_loop():
+    with TestClient(app) as loaded:
+        resp = loaded.post("/api/v1/ml/predictions", json=[{"category": "Poetry", "rating": 4}, {}])
+        assert resp.status_code == 200
+        assert [p["details"]["category"] for p in resp.json()] == ["Poetry", "Unknown"]
+        invalid = loaded.post("/api/v1/ml/predictions", json=[{"rating": "x"}])
+        assert invalid.status_code == 422
+        assert invalid.json()["detail"][0]["loc"] == ["body", 0, "rating"]
+        # mesmo 422 que o FastAPI daria validando o corpo no event loop
+        broken = loaded.post("/api/v1/ml/predictions", content=b"[{", headers={"content-type": "application/json"})
+        error = {"error": "Expecting property name enclosed in double quotes"}
+        assert broken.json()["detail"] == [
+            {"type": "json_invalid", "loc": ["body", 2], "msg": "JSON decode error", "input": {}, "ctx": error}
+        ]
+        empty = loaded.post("/api/v1/ml/predictions", content=b"", headers={"content-type": "application/json"})
+        assert [(e["type"], e["loc"]) for e in empty.json()["detail"]] == [("missing", ["body"])]
+
+def test_aggregates_follow_incremental_changes():
+    df = prepare_books(make_books(300))
+    aggregates = Aggregates.from_frame(df.iloc[:250])
+    # troca de versão de 20 livros + 50 novos, como no merge do scraper
+    changed = df.iloc[:20].copy()
+    changed["price_num"] += 1.0
+    changed["category"] = "Poetry"
+    aggregates.remove(df.iloc[:20])
+    aggregates.add(pd.concat([changed, df.iloc[250:]]))
+
+    expected = Aggregates.from_frame(pd.concat([changed, df.iloc[20:]]))
+    assert aggregates.to_dict() == expected.to_dict()
+    restored = Aggregates.from_dict(json.loads(json.dumps(aggregates.to_dict())))
+    assert restored.category_breakdown() == expected.category_breakdown()
+
+def test_stats_endpoints_match_dataset():
+    with TestClient(app) as loaded:
+        df = dataset_provider.get().df
+        overview = loaded.get("/api/v1/stats/overview").json()
+        assert overview["total_books"] == len(df)
+        assert overview["average_price"] == pytest.approx(df["price_num"].mean())
+
+        ratings = loaded.get("/api/v1/stats/ratings").json()
+        assert sum(ratings["ratings"].values()) + ratings["unrated"] == len(df)
+
+        breakdown = loaded.get("/api/v1/stats/categories").json()["categories"]
+        poetry = next(c for c in breakdown if c["category"] == "Poetry")
+        assert poetry["count"] == int((df["category"] == "Poetry").sum())
+        assert sum(b["count"] for b in poetry["price_histogram"]) == poetry["count"]
+
+        stock = loaded.get("/api/v1/stats/stock").json()
+        assert stock["stock_total"] == int(df["stock"].sum())
+        assert stock["in_stock"] + stock["out_of_stock"] == len(df)
+
+def test_async_routes_answer_503_without_loading_on_event_loop(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("carga no event loop")
+
+    monkeypatch.setattr(dataset_provider, "_current", None)
+    monkeypatch.setattr(dataset_provider, "load", fail)
+    for url in ("/api/v1/health", "/api/v1/books/1", "/api/v1/stats/overview", "/api/v1/categories"):
+        resp = client.get(url)
+        assert resp.status_code == 503, url
+        assert resp.headers["retry-after"] == str(settings.RETRY_AFTER_SECONDS)
+
+def test_streaming_exports_hold_endpoint_slot(monkeypatch):
+    from api import concurrency
+
+    limit = concurrency.EndpointLimit("ml_training_stream", 1, 0, queue_timeout=5)
+    monkeypatch.setitem(concurrency._limits, "ml_training_stream", limit)
+    url = "/api/v1/ml/training-data/stream"
+    with TestClient(app) as loaded:
+        limit.pending = 1  # um download em andamento ocupando a única vaga
+        shed = loaded.get(url)
+        assert shed.status_code == 503 and shed.headers["retry-after"] == str(settings.RETRY_AFTER_SECONDS)
+
+        limit.pending = 0
+        assert len(loaded.get(url, params={"batch_size": 100}).text.splitlines()) == 1000
+        assert loaded.get(url, params={"version": "outra"}).status_code == 409
+        # vaga devolvida no fim do envio e também quando o stream nem começa
+        assert limit.pending == 0
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+import httpx
+import pandas as pd
+from benchmarks.synthetic import make_books, serve_site, write_site
+import pytest
+from api.jobs import ScrapeJobManager, read_job
+from scripts import parsers
+from scripts.parsers import ParserBackend, available_backends, get_parser
+from api.aggregates import Aggregates
+from api.snapshot import read_aggregates, snapshot_path
+from api.utils import load_data
+from scripts import scrape_books
+from scripts.scrape_books import HostRateLimiter, _retry_after, fetch, merge_books, scrape_all_books
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_async_crawl_against_local_site(tmp_path):
+    write_site(tmp_path / "site", 45, per_page=20)
+    output = tmp_path / "out" / "books.csv"
+    with serve_site(tmp_path / "site") as base_url:
+        books = scrape_all_books(
+            str(output), base_url=base_url, max_concurrency=4, rate_limit=0, cache_dir=""
+        )
+
+    expected = make_books(45)
+    # ordem do site preservada mesmo com downloads concorrentes
+    assert [b["title"] for b in books] == expected["title"].tolist()
+    assert books[0]["category"] == expected["category"][0]
+    assert books[0]["price"] == expected["price"][0]
+    saved = pd.read_csv(output)
+    assert saved["id"].tolist() == list(range(1, 46))
+
+
+def test_fetch_retries_on_503():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, text="ok")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch(client, "http://books.test/", HostRateLimiter(0))
+
+    resp = asyncio.run(run())
+    assert resp.text == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("value", ["soon", "Wed, 21 Oct 2015 07:28:00 -0000", "inf"])
+def test_unusable_retry_after_falls_back_to_backoff(value):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) < 2:
+            return httpx.Response(429, headers={"Retry-After": value})
+        return httpx.Response(200, text="ok")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch(client, "http://books.test/", HostRateLimiter(0))
+
+    assert _retry_after(httpx.Response(429, headers={"Retry-After": value})) is None
+    assert asyncio.run(run()).text == "ok"
+
+
+def test_incremental_rescrape_skips_unchanged_pages(tmp_path, monkeypatch):
+    site = tmp_path / "site"
+    write_site(site, 25)
+    output = tmp_path / "books.csv"
+    cache_dir = str(tmp_path / "cache")
+    with serve_site(site) as base_url:
+        scrape_all_books(str(output), base_url=base_url, rate_limit=0, cache_dir=cache_dir)
+        first = pd.read_csv(output)
+
+        # altera um livro; mtime no futuro para o Last-Modified mudar
+        page = next((site / "catalogue").glob("*_3/index.html"))
+        page.write_text(page.read_text(encoding="utf-8").replace("In stock (", "In stock (9"), encoding="utf-8")
+        future = time.time() + 10
+        os.utime(page, (future, future))
+
+        parsed = []
+        bs4 = parsers.BACKENDS["bs4"]
+        spy = ParserBackend(
+            "bs4", lambda content, url: parsed.append(url) or bs4.parse_book(content, url), bs4.parse_listing
+        )
+        monkeypatch.setitem(parsers.BACKENDS, "bs4", spy)
+        # agregados do snapshot anterior + delta do merge, sem recalcular do zero
+        rebuilt, from_frame = [], Aggregates.from_frame
+        monkeypatch.setattr(scrape_books.Aggregates, "from_frame",
+                            classmethod(lambda cls, df: rebuilt.append(df) or from_frame(df)))
+        scrape_all_books(str(output), base_url=base_url, rate_limit=0, cache_dir=cache_dir, parser="bs4")
+        second = pd.read_csv(output)
+
+    # só a página alterada foi parseada de novo; ids estáveis
+    assert len(parsed) == 1 and parsed[0].endswith("_3/index.html")
+    assert second["id"].tolist() == first["id"].tolist()
+    changed = second["availability"] != first["availability"]
+    assert second.loc[changed, "id"].tolist() == [3]
+    assert rebuilt == []
+    stored = read_aggregates(snapshot_path(str(output)))
+    expected = Aggregates.from_frame(load_data(str(output), prefer_snapshot=False)).to_dict()
+    assert {k: v for k, v in stored.items() if k != "version"} == expected
+
+
+def test_merge_books_keeps_ids_and_appends_new():
+    existing = pd.DataFrame([
+        {"id": 7, "title": "A", "price": "£1.00", "rating": 1, "availability": "In stock (1 available)",
+         "category": "Poetry", "image_url": "i/a", "book_url": "u/a"},
+    ])
+    books = [
+        {"title": "B", "price": "£2.00", "rating": 2, "availability": "In stock (2 available)",
+         "category": "Poetry", "image_url": "i/b", "book_url": "u/b"},
+        {**existing.iloc[0].drop("id").to_dict(), "price": "£1.50"},
+    ]
+    merged, counts = merge_books(existing, books)
+    assert merged["id"].tolist() == [7, 8]
+    assert merged["price"].tolist() == ["£1.50", "£2.00"]
+    assert counts == {"new": 1, "changed": 1, "unchanged": 0}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_parser_backends_extract_same_fields(backend):
+    parser = get_parser(backend)
+    book = parser.parse_book((FIXTURES / "book.html").read_bytes(), "https://books.test/catalogue/x_3/index.html")
+    assert book == {
+        "title": "Les Misérables & the Café 3",
+        "price": "£11.54",
+        "rating": 3,
+        "availability": "In stock (11 available)",
+        "category": "Mystery",
+        "image_url": "https://books.test/media/cache/00/00/00000000000000000000000000000003.jpg",
+        "book_url": "https://books.test/catalogue/x_3/index.html",
+    }
+    listing = (FIXTURES / "listing.html").read_bytes()
+    links, next_url = parser.parse_listing(listing, "https://books.test/catalogue/page-2.html")
+    assert len(links) == 20 and links[0].endswith("_21/index.html")
+    assert next_url == "https://books.test/catalogue/page-3.html"
+
+
+def test_process_pool_parsing_keeps_order(tmp_path):
+    write_site(tmp_path / "site", 30)
+    with serve_site(tmp_path / "site") as base_url:
+        kwargs = dict(base_url=base_url, max_concurrency=4, rate_limit=0, cache_dir="", parser="bs4")
+        inline = scrape_all_books(str(tmp_path / "inline.csv"), parse_workers=0, **kwargs)
+        seen = []
+        pooled = scrape_all_books(str(tmp_path / "pooled.csv"), parse_workers=2,
+                                  progress=lambda p: seen.append(p["books"]), **kwargs)
+
+    assert pooled == inline
+    # livros parseados no pool entram nos resultados (e no progresso) ao terminar, não só no fim
+    assert seen == sorted(seen) and seen[-1] == 30
+    assert len({n for n in seen if 0 < n < 30}) > 1
+    assert (tmp_path / "pooled.csv").read_bytes() == (tmp_path / "inline.csv").read_bytes()
+
+def test_scrape_job_runs_in_child_process_single_flight(tmp_path):
+    write_site(tmp_path / "site", 30, per_page=10)
+    output = tmp_path / "books.csv"
+    manager = ScrapeJobManager(str(tmp_path / "jobs"))
+    with serve_site(tmp_path / "site", latency=0.05) as base_url:
+        kwargs = dict(output_path=str(output), base_url=base_url, cache_dir="", rate_limit=0, max_concurrency=4)
+        job, started = manager.start(**kwargs)
+        again, started_again = manager.start(**kwargs)
+        manager.join(60)
+
+    assert started and not started_again
+    assert again["id"] == job["id"]
+    done = read_job(manager.jobs_dir, job["id"])
+    assert done["status"] == "succeeded"
+    assert done["pid"] != os.getpid()
+    assert done["progress"]["books"] == 30
+    assert done["progress"]["pages"] == 33
+    assert len(pd.read_csv(output)) == 30
+    # o lock foi liberado ao fim do job
+    assert manager._acquire()
+    manager._release()
+
+def test_scheduler_survives_start_failure(tmp_path):
+    manager = ScrapeJobManager(str(tmp_path / "jobs"))
+    calls = []
+
+    def start(trigger, **kwargs):
+        calls.append(trigger)
+        if len(calls) == 1:
+            raise OSError("flock falhou")
+        manager._stop.set()
+        return {}, True
+
+    manager.start = start
+    manager.schedule(0.001)
+    manager._scheduler.join(10)
+    assert calls == ["scheduled", "scheduled"]